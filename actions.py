@@ -0,0 +1,63 @@
+"""
+This module holds the compact encoding of the game actions.
+Genes and environments work with uint8 action codes, and the 'u/d/l/r' symbols
+are only used at the edges: printing genes and reading human or auto agent inputs.
+"""
+
+import numpy as np
+
+# action codes, in the same order as the action_space of the games
+DOWN, RIGHT, UP, LEFT = 0, 1, 2, 3
+
+ACTION_DTYPE = np.uint8
+ACTION_SPACE = np.array([DOWN, RIGHT, UP, LEFT], dtype=ACTION_DTYPE)
+ACTION_SYMBOLS = np.array(['d', 'r', 'u', 'l'])
+
+# (row, column) displacement of each action code
+ACTION_DELTAS = np.array([(1, 0), (0, 1), (-1, 0), (0, -1)])
+
+# the action that undoes each action code: down <-> up, right <-> left
+OPPOSITE_ACTIONS = np.array([UP, LEFT, DOWN, RIGHT], dtype=ACTION_DTYPE)
+
+
+def encode_actions(movements) -> np.ndarray:
+    """
+    Convert a sequence of 'u/d/l/r' symbols into an array of action codes.
+    Sequences that are already encoded are returned as action codes as well.
+    """
+    movements = np.asarray(movements)
+    if movements.dtype.kind in 'iu':
+        return movements.astype(ACTION_DTYPE)
+    codes = np.full(movements.shape, len(ACTION_SYMBOLS), dtype=ACTION_DTYPE)
+    for code, symbol in enumerate(ACTION_SYMBOLS):
+        codes[movements == symbol] = code
+    if (codes == len(ACTION_SYMBOLS)).any():
+        raise ValueError(f"unknown actions in {movements.tolist()}, expected any of {ACTION_SYMBOLS.tolist()}")
+    return codes
+
+
+def decode_actions(gene) -> list[str]:
+    """
+    Convert an array of action codes back into a list of 'u/d/l/r' symbols.
+    """
+    return ACTION_SYMBOLS[np.asarray(gene, dtype=np.intp)].tolist()
+
+
+def pack_actions(actions) -> np.ndarray:
+    """
+    Pack a flat array of action codes 2 bits each, 4 actions per byte.
+    """
+    actions = np.asarray(actions, dtype=ACTION_DTYPE)
+    quads = np.zeros((len(actions) + 3) // 4 * 4, dtype=np.uint8)
+    quads[:len(actions)] = actions
+    quads = quads.reshape(-1, 4)
+    return quads[:, 0] | (quads[:, 1] << 2) | (quads[:, 2] << 4) | (quads[:, 3] << 6)
+
+
+def unpack_actions(packed, count: int) -> np.ndarray:
+    """
+    Unpack the first count action codes of an array packed by pack_actions.
+    """
+    packed = np.asarray(packed, dtype=np.uint8)
+    shifts = np.array([0, 2, 4, 6], dtype=np.uint8)
+    return ((packed[:, None] >> shifts) & 3).astype(ACTION_DTYPE).ravel()[:count]
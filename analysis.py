@@ -1,42 +1,101 @@
 """
 In this module we run all the GAs to measure its performance.
-The implementation here doe snot apply the slippery mode.
+Trials are independent, so they are spread over a pool of worker processes,
+each trial drawing from generators seeded by its own index, so that results do not depend on the scheduling.
+Run it with --slippery to apply the slippery mode, and add --monte-carlo to evaluate genes over many rollouts.
 """
 
+import argparse
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from tqdm import tqdm
+
+from board_corpus import BoardCorpus
 from frozen_lake_raw import FrozenLakeRaw
 from genetic_solver import GeneticAlgorithmSolver
-from objects import AlgorithmStats
 from genetic_algorithm_fps import GeneticAlgorithmSolverFPS
 from genetic_algorithm_tournament import GeneticAlgorithmSolverTournament
-from tqdm import tqdm
+from monte_carlo import MonteCarloFitness
+
+# solver classes and gene lengths used for each mode, all of them with a population of 10
+SOLVER_CONFIGS = {
+    False: [(GeneticAlgorithmSolver, 3), (GeneticAlgorithmSolverFPS, 8), (GeneticAlgorithmSolverTournament, 8)],
+    True: [(GeneticAlgorithmSolver, 3), (GeneticAlgorithmSolverFPS, 10), (GeneticAlgorithmSolverTournament, 10)],
+}
+
+
+@functools.lru_cache(maxsize=None)
+def open_corpus(path: str) -> BoardCorpus:
+    """
+    Open a board corpus once per process.
+    """
+    return BoardCorpus(path)
 
-def main(num_runs):
-    solver_generations = []
-    fps_generations = []
-    tournament_generations = []
 
-    for i in tqdm(range(num_runs)):
-        # create a new game for every trial
-        frozen_lake_game = FrozenLakeRaw()
-        genetic_algorithm_solver = GeneticAlgorithmSolver(frozen_lake_game, population_size=10, gene_length=3, mutation_method=None)
-        genetic_algorithm_fps = GeneticAlgorithmSolverFPS(frozen_lake_game, population_size=10, gene_length=8, mutation_method=None)
-        genetic_algorithm_tournament = GeneticAlgorithmSolverTournament(frozen_lake_game, population_size=10, gene_length=8, mutation_method=None)
+def run_trial(task):
+    """
+    Play one trial: create a new game, or take the next board of the corpus, and solve it with every solver.
+    Returns the number of generations each solver needed.
+    """
+    trial, seed, slippery, corpus_path, monte_carlo = task
+    # independent streams for the game and every solver, derived from the trial index
+    game_seed, *solver_seeds = np.random.SeedSequence(seed, spawn_key=(trial,)).spawn(1 + len(SOLVER_CONFIGS[slippery]))
+    if corpus_path is None:
+        frozen_lake_game = FrozenLakeRaw(slippery=slippery, rng=np.random.default_rng(game_seed))
+    else:
+        corpus = open_corpus(corpus_path)
+        frozen_lake_game = corpus.lake(trial % len(corpus), rng=np.random.default_rng(game_seed))
+    generations = []
+    for (solver_class, gene_length), solver_seed in zip(SOLVER_CONFIGS[slippery], solver_seeds):
+        solver = solver_class(frozen_lake_game, population_size=10, gene_length=gene_length, mutation_method=None,
+                              rng=np.random.default_rng(solver_seed),
+                              monte_carlo=MonteCarloFitness() if monte_carlo else None)
+        solver.solve()
+        generations.append(solver.stats.generation)
+    return generations
 
-        genetic_algorithm_solver.solve()
-        solver_generations.append(genetic_algorithm_solver.stats.generation)
 
-        genetic_algorithm_fps.solve()
-        fps_generations.append(genetic_algorithm_fps.stats.generation)
+def main(num_runs, slippery: bool = False, workers: int = None, chunksize: int = None, seed: int = 0,
+         corpus_path: str = None, monte_carlo: bool = False):
+    """
+    Run num_runs trials over workers processes (all the cores by default) and print
+    the average generations of every solver.
+    Tasks are submitted in chunks of chunksize trials to keep the inter-process overhead low.
+    With a board corpus, trial i plays board i of the corpus, and the slippery mode of the corpus is used.
+    With monte_carlo, genes of slippery lakes are evaluated with MonteCarloFitness.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunksize = chunksize or max(1, num_runs // (workers * 4))
+    if corpus_path is not None:
+        slippery = open_corpus(corpus_path).slippery
+    tasks = [(trial, seed, slippery, corpus_path, monte_carlo) for trial in range(num_runs)]
+    solver_names = [solver_class.__name__ for solver_class, _ in SOLVER_CONFIGS[slippery]]
+    totals = dict.fromkeys(solver_names, 0)
 
-        genetic_algorithm_tournament.solve()
-        tournament_generations.append(genetic_algorithm_tournament.stats.generation)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(run_trial, tasks, chunksize=chunksize)
+        for generations in tqdm(results, total=num_runs):
+            for name, generation in zip(solver_names, generations):
+                totals[name] += generation
 
-    avg_solver_generations = sum(solver_generations) / num_runs
-    avg_fps_generations = sum(fps_generations) / num_runs
-    avg_tournament_generations = sum(tournament_generations) / num_runs
+    averages = {name: total / num_runs for name, total in totals.items()}
+    for name, average in averages.items():
+        print(f"Average generations for {name}: {average}")
+    return averages
 
-    print(f"Average generations for GeneticAlgorithmSolver: {avg_solver_generations}")
-    print(f"Average generations for GeneticAlgorithmSolverFPS: {avg_fps_generations}")
-    print(f"Average generations for GeneticAlgorithmSolverTournament: {avg_tournament_generations}")
 
-main(1000)
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the generations needed by every GA to solve random lakes")
+    parser.add_argument("--runs", type=int, default=1000, help="number of games to play")
+    parser.add_argument("--slippery", action="store_true", help="play slippery lakes")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, all the cores by default")
+    parser.add_argument("--chunksize", type=int, default=None, help="trials submitted to a worker at once")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the whole experiment")
+    parser.add_argument("--corpus", default=None, help="board corpus to play instead of random boards")
+    parser.add_argument("--monte-carlo", action="store_true", help="evaluate slippery genes over many rollouts")
+    args = parser.parse_args()
+    main(args.runs, slippery=args.slippery, workers=args.workers, chunksize=args.chunksize, seed=args.seed,
+         corpus_path=args.corpus, monte_carlo=args.monte_carlo)
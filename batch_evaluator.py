@@ -0,0 +1,208 @@
+"""
+This module evaluates a whole population of genes at once.
+Instead of calling take_action once per movement, every agent is advanced one step
+per vectorized NumPy operation, following the exact same rules as FrozenLakeRaw.take_action
+and looking moves up in the transition tables of the game.
+Every evaluation goes through play_games: a population on one board is the single board case of evaluate_boards,
+and the suffixes of cached prefixes are the same games started from the cached states.
+"""
+
+import numpy as np
+
+from objects import PopulationResult
+from prefix_cache import prefix_hashes
+
+
+class StackedTables:
+    """
+    The transition tables of a list of boards, stacked into flat arrays indexed by state * num_actions + action.
+    Board b holds the states offset[b] ... offset[b] + size[b] ** 2 - 1 of the stacked tables,
+    and a game given more than once is stored once.
+    """
+    def __init__(self, lakes):
+        distinct = {}
+        for lake in lakes:
+            distinct.setdefault(id(lake), lake)
+        tables = list(distinct.values())
+        starts = np.cumsum([0] + [lake.size * lake.size for lake in tables])
+        if len(tables) == 1:
+            # a single board uses the tables of its game as they are, without copying them
+            self.next_state = tables[0].next_state.ravel()
+            self.step_reward = tables[0].step_reward.ravel()
+            self.terminal = tables[0].terminal.ravel()
+        else:
+            self.next_state = np.concatenate([lake.next_state.ravel() + start for lake, start in zip(tables, starts)])
+            self.step_reward = np.concatenate([lake.step_reward.ravel() for lake in tables])
+            self.terminal = np.concatenate([lake.terminal.ravel() for lake in tables])
+        self.num_actions: int = len(tables[0].action_space)
+
+        board_start = dict(zip(distinct, starts[:-1].tolist()))
+        self.offset = np.array([board_start[id(lake)] for lake in lakes], dtype=np.int64)
+        self.size = np.array([lake.size for lake in lakes], dtype=np.int64)
+        # the goal of every board, as a state of the stacked tables
+        self.goal_state = self.offset + np.array([lake.goal_state for lake in lakes], dtype=np.int64)
+        self.slip_probability = np.array([lake.slip_probability if lake.slippery else 0.0 for lake in lakes])
+        self.slippery: bool = bool(self.slip_probability.any())
+
+    def transition(self, state, action, board, rng=None):
+        """
+        Position in the tables of the move of every game: action taken from state, a state of the stacked tables,
+        on the given board. On slippery boards the action slips to one of the three other actions, uniformly,
+        with the slips drawn from rng.
+        """
+        action = np.asarray(action, dtype=np.int64)
+        if self.slippery:
+            slipped = rng.random(len(action)) < self.slip_probability[board]
+            action = np.where(slipped, (action + rng.integers(1, self.num_actions, len(action))) % self.num_actions, action)
+        return state * self.num_actions + action
+
+
+def play_games(tables: StackedTables, actions, lengths, genes, boards, stop_on_game_over: bool = True,
+               rng=None, start=None, on_step=None):
+    """
+    Play row genes[g] of the action matrix on board boards[g] of the tables, for every game g.
+    Every step advances the games still moving by one move, each one at its own column of its gene.
+    A game stops at the end of its gene, or as soon as it is over if stop_on_game_over; otherwise
+    every move after a game over restarts from the start of the board, just like take_action does.
+    start holds the column, state (of the stacked tables), total reward, game over and won to resume every game from,
+    by default every game starts from its first move on the start of its board.
+    on_step(rows, column, state, total_reward, game_over, won) is called after every step with the games that moved.
+    Returns the column, state, total reward, game over and won of every game, and the number of moves played.
+    """
+    count = len(genes)
+    if start is None:
+        column = np.zeros(count, dtype=np.int64)
+        state = tables.offset[boards].copy()
+        total_reward = np.zeros(count)
+        game_over = np.zeros(count, dtype=bool)
+        won = np.zeros(count, dtype=bool)
+    else:
+        column, state, total_reward, game_over, won = start
+    game_lengths = lengths[genes]
+    first_state = tables.offset[boards]
+    goal_state = tables.goal_state[boards]
+    # games starting together share their column, and game g playing row g reads the rows in order
+    same_column = start is None
+    row_per_game = count == len(actions) and np.array_equal(genes, np.arange(count))
+
+    moving = column < game_lengths
+    if stop_on_game_over:
+        moving &= ~game_over
+    rows = np.flatnonzero(moving)
+    steps = 0
+    move = 0
+    while rows.size:
+        # while every game is moving, whole arrays are used instead of gathering the moving games
+        every = rows.size == count
+        index = slice(None) if every else rows
+        board = boards[index]
+        if not stop_on_game_over:
+            restarted = np.flatnonzero(game_over[index])
+            restarted = restarted if every else rows[restarted]
+            state[restarted] = first_state[restarted]
+        if same_column:
+            action = actions[slice(None) if every and row_per_game else genes[index], move]
+        else:
+            action = actions[genes[index], column[index]]
+        current = state[index]
+        transition = tables.transition(current, action, board, rng)
+        ended = tables.terminal[transition]
+        next_state = tables.next_state[transition]
+        total_reward[index] += tables.step_reward[transition]
+        won[index] |= ended & (next_state == goal_state[index])
+        game_over[index] |= ended
+        state[index] = np.where(ended, current, next_state)
+        column[index] += 1
+        steps += rows.size
+        move += 1
+        if on_step is not None:
+            on_step(rows, column, state, total_reward, game_over, won)
+
+        moving = column[index] < game_lengths[index]
+        if stop_on_game_over:
+            moving &= ~game_over[index]
+        rows = rows[moving]
+    return column, state, total_reward, game_over, won, steps
+
+
+def action_matrix(actions, lengths=None):
+    """
+    The action matrix as a 2-D array, and the lengths of its rows, capped to its width (every row by default).
+    """
+    actions = np.asarray(actions)
+    if actions.ndim != 2:
+        raise ValueError("actions must be a 2-D matrix with one gene per row")
+    population_size, gene_length = actions.shape
+    if lengths is None:
+        return actions, np.full(population_size, gene_length)
+    return actions, np.minimum(lengths, gene_length)
+
+
+def evaluate_population(frozen_lake, actions, lengths=None, stop_on_game_over: bool = True,
+                        prefix_cache=None) -> PopulationResult:
+    """
+    Play every row of the action matrix on a fresh copy of the game.
+    actions holds action codes, one gene per row, and
+    lengths holds the number of valid movements of each row (the rest is padding).
+    If stop_on_game_over is False, agents keep moving after falling in a hole or reaching
+    the goal, restarting from (0, 0) on every move, just like take_action does.
+    The game state of frozen_lake itself is left untouched, slips are drawn from its generator.
+    With a PrefixStateCache on a deterministic lake, only the moves after the longest cached prefix
+    of every row are simulated, see evaluate_suffixes.
+    """
+    if prefix_cache is not None and not frozen_lake.slippery:
+        actions, lengths = action_matrix(actions, lengths)
+        return evaluate_suffixes(frozen_lake, actions, lengths, stop_on_game_over, prefix_cache)
+    return evaluate_boards([frozen_lake], actions, lengths, stop_on_game_over, frozen_lake.rng)
+
+
+def evaluate_suffixes(frozen_lake, actions, lengths, stop_on_game_over: bool, prefix_cache) -> PopulationResult:
+    """
+    Same as evaluate_population on a deterministic lake, but every row starts from the state cached for its
+    longest known prefix, so the work done is the total length of the suffixes, and the state after every
+    new block of moves is cached.
+    """
+    key = prefix_cache.cache_key(frozen_lake, stop_on_game_over)
+    block = prefix_cache.block
+    hashes = prefix_hashes(actions, block)
+    start = prefix_cache.lookup(key, hashes, lengths)
+
+    new_prefixes = []
+
+    def cache_blocks(rows, column, state, total_reward, game_over, won):
+        ended_block = rows[column[rows] % block == 0]
+        if ended_block.size:
+            depths = column[ended_block] // block
+            new_prefixes.append((hashes[ended_block, depths], depths, state[ended_block],
+                                 total_reward[ended_block], game_over[ended_block], won[ended_block]))
+
+    population_size = len(actions)
+    _, state, total_reward, game_over, won, steps = play_games(
+        StackedTables([frozen_lake]), actions, lengths, np.arange(population_size),
+        np.zeros(population_size, dtype=np.int64), stop_on_game_over, start=start, on_step=cache_blocks)
+
+    if new_prefixes:
+        prefix_cache.insert(key, *(np.concatenate(arrays) for arrays in zip(*new_prefixes)))
+    prefix_cache.misses += steps
+    player_pos = np.stack(np.divmod(state, frozen_lake.size), axis=1)
+    return PopulationResult(total_reward, won, game_over, player_pos, steps=steps)
+
+
+def evaluate_boards(lakes, actions, lengths=None, stop_on_game_over: bool = True, rng=None) -> PopulationResult:
+    """
+    Play every row of the action matrix on every board of lakes.
+    The result has one entry per gene and board, gene-major: entry gene * len(lakes) + board.
+    The tables of the boards are stacked so the whole genes x boards product advances in one vectorized pass,
+    and only the games still moving are stepped. Slips, on the slippery lakes, are drawn from rng.
+    """
+    actions, lengths = action_matrix(actions, lengths)
+    tables = StackedTables(lakes)
+    if tables.slippery:
+        rng = np.random.default_rng(rng)
+    population_size, boards = len(actions), len(lakes)
+    genes = np.repeat(np.arange(population_size), boards)
+    board = np.tile(np.arange(boards), population_size)
+    _, state, total_reward, game_over, won, steps = play_games(
+        tables, actions, lengths, genes, board, stop_on_game_over, rng)
+    player_pos = np.stack(np.divmod(state - tables.offset[board], tables.size[board]), axis=1)
+    return PopulationResult(total_reward, won, game_over, player_pos, steps=steps)
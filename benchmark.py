@@ -0,0 +1,185 @@
+"""
+In this module we measure the throughput of the game and of the GAs.
+It reports environment steps per second (single take_action calls and batched evaluations),
+generations per second and wall time to solve for every solver, over a sweep of board sizes,
+population sizes, gene lengths and slippery modes. On deterministic lakes the winning genes are also
+compared to the shortest path found by the exact solver (optimality gap, in extra moves).
+Results are written as JSON, and can be compared against a stored baseline to catch regressions:
+
+    python benchmark.py --output results.json --save-baseline baseline.json
+    python benchmark.py --output results.json --baseline baseline.json
+"""
+
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+from batch_evaluator import evaluate_population
+from exact_solver import moves_to_win, shortest_path
+from frozen_lake_raw import FrozenLakeRaw
+from solvers import SOLVERS
+
+# metrics compared against the baseline, and whether higher values are better
+METRICS = {
+    'steps_per_second': True,
+    'batched_steps_per_second': True,
+    'generations_per_second': True,
+    'seconds_to_solve': False,
+}
+
+
+def bench_env_steps(size: int, slippery: bool, steps: int, population_size: int, seed: int) -> dict:
+    """
+    Time single take_action calls, and the batched evaluator on a population of random genes.
+    The single steps play episodes as an agent would, restarting the game after every hole or goal,
+    so they time normal moves rather than the restart of a game that is over.
+    """
+    rng = np.random.default_rng(seed)
+    frozen_lake = FrozenLakeRaw(size=size, slippery=slippery, rng=rng)
+    actions = rng.integers(0, len(frozen_lake.action_space), steps).tolist()
+    start = time.perf_counter()
+    for action in actions:
+        frozen_lake.take_action(action)
+        if frozen_lake.game_over:
+            frozen_lake.restart()
+    single_seconds = time.perf_counter() - start
+
+    gene_length = max(1, steps // population_size)
+    population = rng.integers(0, len(frozen_lake.action_space), (population_size, gene_length), dtype=np.uint8)
+    start = time.perf_counter()
+    evaluate_population(frozen_lake, population, stop_on_game_over=False)
+    batched_seconds = time.perf_counter() - start
+    return {
+        'steps_per_second': steps / single_seconds,
+        'batched_steps_per_second': population.size / batched_seconds,
+    }
+
+
+def bench_solver(solver_class, size: int, slippery: bool, population_size: int, gene_length: int,
+                 trials: int, seed: int) -> dict:
+    """
+    Solve trials random lakes with the solver, timing every solve.
+    """
+    seeds = np.random.SeedSequence(seed).spawn(2 * trials)
+    generations = 0
+    seconds = 0.0
+    solve_seconds = []
+    gaps = []
+    for trial in range(trials):
+        frozen_lake = FrozenLakeRaw(size=size, slippery=slippery, rng=np.random.default_rng(seeds[2 * trial]))
+        solver = solver_class(frozen_lake, population_size, gene_length, None, rng=np.random.default_rng(seeds[2 * trial + 1]))
+        start = time.perf_counter()
+        solver.solve()
+        elapsed = time.perf_counter() - start
+        generations += solver.stats.generation
+        seconds += elapsed
+        if solver.stats.generation <= solver.max_generations:
+            solve_seconds.append(elapsed)
+            if not slippery:
+                moves = moves_to_win(frozen_lake, solver.stats.best_gene)
+                if moves is not None:
+                    gaps.append(moves - len(shortest_path(frozen_lake).actions))
+    return {
+        'generations_per_second': generations / seconds,
+        'seconds_to_solve': float(np.mean(solve_seconds)) if solve_seconds else None,
+        'solved_fraction': len(solve_seconds) / trials,
+        'mean_generations': generations / trials,
+        'optimality_gap': float(np.mean(gaps)) if gaps else None,
+    }
+
+
+def run_benchmarks(sizes, population_sizes, gene_lengths, slippery_modes, trials: int = 3,
+                   steps: int = 100_000, seed: int = 0) -> dict:
+    """
+    Run the whole sweep and return the results in the JSON layout of the suite.
+    """
+    results = []
+    for size, slippery in itertools.product(sizes, slippery_modes):
+        params = {'size': size, 'slippery': slippery, 'steps': steps, 'population_size': max(population_sizes)}
+        metrics = bench_env_steps(size, slippery, steps, max(population_sizes), seed)
+        results.append({'benchmark': 'env_steps', 'params': params, 'metrics': metrics})
+        print(f"env_steps {params}: {metrics}", file=sys.stderr)
+
+    for solver_class, size, population_size, gene_length, slippery in itertools.product(
+            SOLVERS.values(), sizes, population_sizes, gene_lengths, slippery_modes):
+        params = {'solver': solver_class.__name__, 'size': size, 'population_size': population_size,
+                  'gene_length': gene_length, 'slippery': slippery, 'trials': trials}
+        metrics = bench_solver(solver_class, size, slippery, population_size, gene_length, trials, seed)
+        results.append({'benchmark': 'solver', 'params': params, 'metrics': metrics})
+        print(f"solver {params}: {metrics}", file=sys.stderr)
+
+    return {
+        'metadata': {'python': platform.python_version(), 'numpy': np.__version__,
+                     'machine': platform.machine(), 'seed': seed, 'created': time.time()},
+        'results': results,
+    }
+
+
+def compare_to_baseline(report: dict, baseline: dict, tolerance: float = 0.2) -> list:
+    """
+    Compare every metric of the report to the same benchmark in the baseline.
+    Returns the regressions: metrics that got worse by more than tolerance (a fraction).
+    """
+    def key(result):
+        return result['benchmark'], json.dumps(result['params'], sort_keys=True)
+
+    baseline_results = {key(result): result['metrics'] for result in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        reference = baseline_results.get(key(result))
+        if reference is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            value, reference_value = result['metrics'].get(metric), reference.get(metric)
+            if value is None or not reference_value:
+                continue
+            ratio = value / reference_value
+            if (ratio < 1 - tolerance) if higher_is_better else (ratio > 1 + tolerance):
+                regressions.append({'benchmark': result['benchmark'], 'params': result['params'], 'metric': metric,
+                                    'baseline': reference_value, 'value': value, 'ratio': ratio})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the frozen lake environment and the GAs")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4, 8])
+    parser.add_argument("--population-sizes", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--gene-lengths", type=int, nargs="+", default=[8, 16])
+    parser.add_argument("--slippery", choices=["no", "yes", "both"], default="both")
+    parser.add_argument("--trials", type=int, default=3, help="lakes solved per solver configuration")
+    parser.add_argument("--steps", type=int, default=100_000, help="environment steps timed per board")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json", help="where to write the JSON results")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown before failing")
+    parser.add_argument("--save-baseline", help="also write the results to this baseline file")
+    args = parser.parse_args()
+
+    slippery_modes = {"no": [False], "yes": [True], "both": [False, True]}[args.slippery]
+    report = run_benchmarks(args.sizes, args.population_sizes, args.gene_lengths, slippery_modes,
+                            trials=args.trials, steps=args.steps, seed=args.seed)
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare_to_baseline(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression['benchmark']} {regression['params']} {regression['metric']}: "
+                  f"{regression['value']:.4g} vs baseline {regression['baseline']:.4g}")
+        if regressions:
+            sys.exit(1)
+        print("no regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+This module stores many boards in a memory-mapped file, so every solver, run or machine
+can play exactly the same lakes.
+The holes of every board are packed as bits (one row of bytes per board) in a .npy file,
+and a JSON index next to it describes the corpus. Boards are generated in bulk and the file
+is opened read-only, so worker processes share the same pages instead of building their own boards.
+Only the packed rows are read without copying: a hole grid, and the game built on it, unpack their own copy
+of the board, which the transition tables of the game need anyway.
+
+    python board_corpus.py boards.npy --count 100000 --size 4 --seed 0
+"""
+
+import argparse
+import json
+
+import numpy as np
+
+from frozen_lake_raw import FrozenLakeRaw, generate_hole_grids
+
+# boards generated per vectorized pass, to bound the memory used by generate_hole_grids
+CELLS_PER_CHUNK = 1 << 24
+
+
+def index_path(path: str) -> str:
+    return path + ".json"
+
+
+def create_corpus(path: str, count: int, size: int = 4, slippery: bool = False,
+                  hole_probability: float = FrozenLakeRaw.hole_probability, seed=None) -> "BoardCorpus":
+    """
+    Generate count boards and store them at path, with their index at path + '.json'.
+    """
+    rng = np.random.default_rng(seed)
+    row_bytes = (size * size + 7) // 8
+    boards = np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=(count, row_bytes))
+    chunk = max(1, CELLS_PER_CHUNK // (size * size))
+    for start in range(0, count, chunk):
+        stop = min(count, start + chunk)
+        holes = generate_hole_grids(rng, size, stop - start, hole_probability)
+        boards[start:stop] = np.packbits(holes.reshape(stop - start, -1), axis=1)
+    boards.flush()
+    del boards
+
+    index = {'count': count, 'size': size, 'slippery': slippery, 'hole_probability': hole_probability,
+             'row_bytes': row_bytes, 'seed': seed}
+    with open(index_path(path), "w") as file:
+        json.dump(index, file, indent=2)
+    return BoardCorpus(path)
+
+
+class BoardCorpus:
+    """
+    Read-only view of a board corpus. Boards are read from the memory map on demand.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(index_path(path)) as file:
+            self.index = json.load(file)
+        self.size: int = self.index['size']
+        self.slippery: bool = self.index['slippery']
+        self.boards = np.load(path, mmap_mode="r")
+        if self.boards.shape != (self.index['count'], self.index['row_bytes']):
+            raise ValueError(f"{path} does not match its index {index_path(path)}")
+
+    def __len__(self):
+        return len(self.boards)
+
+    def packed(self, index: int) -> np.ndarray:
+        """
+        The packed hole bits of a board, as a view of the memory map.
+        """
+        return self.boards[index]
+
+    def holes(self, index: int) -> np.ndarray:
+        """
+        The (size, size) boolean hole grid of a board, unpacked into a new array of one byte per cell.
+        """
+        bits = np.unpackbits(self.boards[index], count=self.size * self.size)
+        return bits.reshape(self.size, self.size).view(bool)
+
+    def lake(self, index: int, rng=None, game_class=FrozenLakeRaw):
+        """
+        Build a game on a board of the corpus. rng only drives the slips of the game.
+        The game holds its own unpacked copy of the holes and its transition tables, not a view of the corpus.
+        """
+        return game_class(size=self.size, slippery=self.slippery, rng=rng, holes=self.holes(index))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a memory-mapped corpus of frozen lake boards")
+    parser.add_argument("path", help="where to write the boards (.npy), the index goes to path + '.json'")
+    parser.add_argument("--count", type=int, required=True)
+    parser.add_argument("--size", type=int, default=4)
+    parser.add_argument("--slippery", action="store_true")
+    parser.add_argument("--hole-probability", type=float, default=FrozenLakeRaw.hole_probability)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    corpus = create_corpus(args.path, args.count, args.size, args.slippery, args.hole_probability, args.seed)
+    print(f"{len(corpus)} boards of size {corpus.size} written to {args.path}")
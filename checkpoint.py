@@ -0,0 +1,183 @@
+"""
+This module saves the state of a GA run to disk and resumes it, so a killed run does not lose its progress.
+A checkpoint is a single uncompressed .npz file, loaded without pickle:
+- the population and the best genes, packed 2 bits per action, with the length of every gene,
+- the board, as packed hole bits,
+- a JSON header with the solver and fitness settings, the counters and the state of the generators of the solver and the game.
+Resuming from a checkpoint continues exactly as the interrupted run would have. A run is only resumed with the
+Monte Carlo and multi-board settings it was saved with, and a checkpoint of a won run is not evolved any further.
+
+    for record in solve_with_checkpoints(solver, "run.npz", every=5):
+        print(record)
+"""
+
+import importlib
+import json
+import os
+
+import numpy as np
+
+from actions import pack_actions, unpack_actions
+from monte_carlo import MonteCarloFitness
+from population import Population
+
+CHECKPOINT_VERSION = 1
+
+
+def pack_genes(population):
+    """
+    Pack the genes of a population into one packed action array and the lengths of the genes.
+    """
+    population = Population.from_genes(population)
+    valid = np.arange(population.genes.shape[1]) < population.lengths[:, None]
+    return pack_actions(population.genes[valid]), population.lengths
+
+
+def unpack_genes(packed, lengths) -> Population:
+    """
+    Inverse of pack_genes.
+    """
+    genes = np.zeros((len(lengths), lengths.max(initial=0)), dtype=np.uint8)
+    genes[np.arange(genes.shape[1]) < lengths[:, None]] = unpack_actions(packed, int(lengths.sum()))
+    return Population(genes, lengths)
+
+
+def save_checkpoint(solver, path: str, won: bool = False):
+    """
+    Write the state of the solver and of its game to path. The file is replaced atomically,
+    so an interrupted save never corrupts the previous checkpoint.
+    won marks the state of a run that just won the game.
+    """
+    frozen_lake = solver.frozen_lake
+    population, population_lengths = pack_genes(solver.population)
+    header = {
+        'version': CHECKPOINT_VERSION,
+        'solver': f"{type(solver).__module__}:{type(solver).__qualname__}",
+        'game': f"{type(frozen_lake).__module__}:{type(frozen_lake).__qualname__}",
+        'population_size': solver.population_size,
+        'gene_length': solver.gene_length,
+        'mutation_method': solver.mutation_method,
+        # constructor arguments of the solver class, e.g. its selection method
+        'solver_settings': solver.solver_settings(),
+        # how genes are scored, which must not change when the run is resumed
+        'fitness_settings': solver.fitness_settings(),
+        'won': won,
+        'generation': solver.generation,
+        'max_generations': solver.max_generations,
+        'buffer': solver.buffer,
+        'elite_size': solver.elite_size,
+        # one number, or one rate per gene
+        'mutation_rate': np.asarray(solver.mutation_rate).tolist(),
+        'evaluations': solver.evaluations,
+        'best_fitness': float(frozen_lake.best_fitness),
+        'size': frozen_lake.size,
+        'slippery': frozen_lake.slippery,
+        'solver_rng': solver.rng.bit_generator.state,
+        'game_rng': frozen_lake.rng.bit_generator.state,
+    }
+    arrays = {
+        'header': np.frombuffer(json.dumps(header).encode(), dtype=np.uint8),
+        'population': population,
+        'population_lengths': population_lengths,
+        'best_gene': pack_actions(solver.best_gene),
+        'best_gene_length': np.array(len(solver.best_gene)),
+        'last_best_gene': pack_actions(solver.last_best_gene),
+        'last_best_gene_length': np.array(len(solver.last_best_gene)),
+        'holes': np.packbits(frozen_lake.holes),
+    }
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        np.savez(file, **arrays)
+    os.replace(temporary_path, path)
+
+
+def read_checkpoint(path: str):
+    """
+    Read the header and the arrays of a checkpoint.
+    """
+    with np.load(path, allow_pickle=False) as checkpoint:
+        arrays = {name: checkpoint[name] for name in checkpoint.files}
+    header = json.loads(arrays.pop('header').tobytes().decode())
+    if header['version'] != CHECKPOINT_VERSION:
+        raise ValueError(f"{path} is a version {header['version']} checkpoint, expected version {CHECKPOINT_VERSION}")
+    return header, arrays
+
+
+def checkpoint_holes(header: dict, arrays: dict) -> np.ndarray:
+    size = header['size']
+    return np.unpackbits(arrays['holes'], count=size * size).reshape(size, size).view(bool)
+
+
+def restore_checkpoint(solver, path: str):
+    """
+    Load a checkpoint into an existing solver, whose game must be played on the same board
+    and whose genes must be scored the same way. Returns the header of the checkpoint.
+    """
+    header, arrays = read_checkpoint(path)
+    frozen_lake = solver.frozen_lake
+    if frozen_lake.size != header['size'] or not np.array_equal(frozen_lake.holes, checkpoint_holes(header, arrays)):
+        raise ValueError(f"{path} was saved on a different board")
+    saved, current = header.get('fitness_settings'), solver.fitness_settings()
+    for name in ('monte_carlo', 'multi_board'):
+        # the caches do not change the fitness, only these settings do
+        if saved is not None and saved[name] != current[name]:
+            raise ValueError(f"{path} was saved with {name} {saved[name]}, the solver has {current[name]}")
+    solver.population = unpack_genes(arrays['population'], arrays['population_lengths'])
+    solver.best_gene = unpack_actions(arrays['best_gene'], int(arrays['best_gene_length']))
+    solver.last_best_gene = unpack_actions(arrays['last_best_gene'], int(arrays['last_best_gene_length']))
+    solver.generation = header['generation']
+    solver.max_generations = header['max_generations']
+    solver.buffer = header['buffer']
+    # settings changed after the solver was built, e.g. by a sweep
+    solver.elite_size = header.get('elite_size', solver.elite_size)
+    mutation_rate = header.get('mutation_rate', solver.mutation_rate)
+    solver.mutation_rate = np.array(mutation_rate) if isinstance(mutation_rate, list) else mutation_rate
+    solver.evaluations = header['evaluations']
+    solver.rng.bit_generator.state = header['solver_rng']
+    frozen_lake.best_fitness = header['best_fitness']
+    frozen_lake.rng.bit_generator.state = header['game_rng']
+    solver.get_algorithm_stats()
+    return header
+
+
+def import_class(name: str):
+    module, qualname = name.split(":")
+    return getattr(importlib.import_module(module), qualname)
+
+
+def load_checkpoint(path: str, **solver_kwargs):
+    """
+    Rebuild the game and the solver saved in a checkpoint, ready to resume.
+    solver_kwargs are passed to the solver, e.g. its instrumentation, along with the saved solver settings,
+    Monte Carlo settings and cache sizes, which they override. The boards of a multi-board run are not saved,
+    so its multi_board must be given again.
+    """
+    header, arrays = read_checkpoint(path)
+    game_class = import_class(header['game'])
+    frozen_lake = game_class(size=header['size'], slippery=header['slippery'], holes=checkpoint_holes(header, arrays))
+    solver_class = import_class(header['solver'])
+    fitness = header.get('fitness_settings', {})
+    fitness_kwargs = {name: fitness[name] for name in ('fitness_cache_size', 'prefix_cache_size') if fitness.get(name)}
+    if fitness.get('monte_carlo') is not None:
+        fitness_kwargs['monte_carlo'] = MonteCarloFitness(**fitness['monte_carlo'])
+    solver_kwargs = {**header.get('solver_settings', {}), **fitness_kwargs, **solver_kwargs}
+    solver = solver_class(frozen_lake, header['population_size'], header['gene_length'], header['mutation_method'],
+                          **solver_kwargs)
+    restore_checkpoint(solver, path)
+    return solver
+
+
+def solve_with_checkpoints(solver, path: str, every: int = 5, **kwargs):
+    """
+    Solve one generation at a time like iter_generations, saving a checkpoint to path every `every` generations
+    and on the winning generation.
+    If path already holds a checkpoint of this board, the run resumes from it; if that run had already won,
+    its result is restored and nothing is yielded.
+    """
+    resume = os.path.exists(path)
+    if resume and restore_checkpoint(solver, path).get('won'):
+        return
+    for record in solver.iter_generations(resume=resume, **kwargs):
+        if record.won or record.generation % every == 0:
+            save_checkpoint(solver, path, won=record.won)
+        yield record
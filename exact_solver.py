@@ -0,0 +1,180 @@
+"""
+This module solves a frozen lake exactly, to have a ground truth to measure the GAs against.
+Both planners work on the transition tables of the game (next_state, step_reward, terminal),
+so they use the same holes, goal and rewards as take_action.
+- On a deterministic lake, a breadth first search finds the shortest winning action sequence.
+- On a slippery lake, value iteration over the state x action model finds the best policy
+  for a given number of moves, taking the slips to the other three actions into account.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+
+from actions import ACTION_DTYPE
+from objects import ExactSolution
+
+# solvability of the last boards checked by is_solvable, by board fingerprint
+SOLVABLE_BOARDS = OrderedDict()
+SOLVABLE_BOARDS_SIZE = 4096
+
+
+def shortest_path(frozen_lake) -> ExactSolution:
+    """
+    Breadth first search from (0, 0) to the goal, expanding the whole frontier at once.
+    Returns the shortest winning action sequence and its total reward, or a solution
+    without actions if the goal cannot be reached.
+    """
+    next_state, terminal = frozen_lake.next_state, frozen_lake.terminal
+    num_states = next_state.shape[0]
+    parent = np.full(num_states, -1)
+    parent_action = np.zeros(num_states, dtype=ACTION_DTYPE)
+    visited = np.zeros(num_states, dtype=bool)
+    visited[0] = True
+    frontier = np.array([0])
+
+    while frontier.size:
+        targets = next_state[frontier]
+        wins = terminal[frontier] & (targets == frozen_lake.goal_state)
+        if wins.any():
+            index, action = np.argwhere(wins)[0]
+            state = frontier[index]
+            actions = [action]
+            while state != 0:
+                actions.append(parent_action[state])
+                state = parent[state]
+            actions = np.array(actions[::-1], dtype=ACTION_DTYPE)
+            return ExactSolution(actions, None, path_return(frozen_lake, actions), 1.0)
+
+        # holes and the goal end the game, so only non terminal moves to unvisited cells are expanded
+        rows, moves = np.nonzero(~terminal[frontier] & ~visited[targets])
+        reached, first = np.unique(targets[rows, moves], return_index=True)
+        parent[reached] = frontier[rows[first]]
+        parent_action[reached] = moves[first]
+        visited[reached] = True
+        frontier = reached
+
+    return ExactSolution(None, None, 0.0, 0.0)
+
+
+def is_solvable(frozen_lake) -> bool:
+    """
+    Whether the goal can be reached from (0, 0), by shortest_path. Slips only swap the action for another one,
+    so a slippery lake is solvable if its deterministic version is. Every board is searched once,
+    the answers for the last SOLVABLE_BOARDS_SIZE boards are kept by board fingerprint.
+    """
+    fingerprint = frozen_lake.board_fingerprint
+    solvable = SOLVABLE_BOARDS.get(fingerprint)
+    if solvable is None:
+        solvable = shortest_path(frozen_lake).actions is not None
+        SOLVABLE_BOARDS[fingerprint] = solvable
+        if len(SOLVABLE_BOARDS) > SOLVABLE_BOARDS_SIZE:
+            SOLVABLE_BOARDS.popitem(last=False)
+    else:
+        SOLVABLE_BOARDS.move_to_end(fingerprint)
+    return solvable
+
+
+def path_return(frozen_lake, actions) -> float:
+    """
+    Total reward of playing the actions from (0, 0) on a deterministic lake.
+    """
+    num_actions = frozen_lake.next_state.shape[1]
+    next_state = frozen_lake.next_state.ravel()
+    step_reward = frozen_lake.step_reward.ravel()
+    state, total_reward = 0, 0.0
+    for action in actions:
+        transition = state * num_actions + int(action)
+        total_reward += step_reward[transition]
+        state = next_state[transition]
+    return float(total_reward)
+
+
+def moves_to_win(frozen_lake, actions):
+    """
+    Number of actions played from (0, 0) until the goal is reached on a deterministic lake,
+    or None if the actions fall into a hole or never reach the goal.
+    """
+    state = 0
+    for move, action in enumerate(actions, start=1):
+        if frozen_lake.terminal[state, action]:
+            return move if frozen_lake.next_state[state, action] == frozen_lake.goal_state else None
+        state = frozen_lake.next_state[state, action]
+    return None
+
+
+def slip_matrix(num_actions: int, slip_probability: float) -> np.ndarray:
+    """
+    Probability of every actual move (columns) given the chosen action (rows):
+    the chosen action with 1 - slip_probability, and each of the other ones evenly otherwise.
+    """
+    probabilities = np.full((num_actions, num_actions), slip_probability / (num_actions - 1))
+    np.fill_diagonal(probabilities, 1 - slip_probability)
+    return probabilities
+
+
+def value_iteration(frozen_lake, horizon: int, objective: str = "return", discount: float = 1.0) -> ExactSolution:
+    """
+    Finite horizon value iteration over the state x action model of the lake.
+    With objective 'return' the policy maximizes the expected total reward of the reward table
+    over horizon moves; with objective 'win' it maximizes the probability of reaching the goal.
+    Holes and the goal end the game. The policy is a (horizon, states) array where policy[t]
+    is the action to take with horizon - t moves left. It is an upper bound for any gene,
+    since a gene cannot react to the slips.
+    """
+    next_state, step_reward, terminal = frozen_lake.next_state, frozen_lake.step_reward, frozen_lake.terminal
+    num_states, num_actions = next_state.shape
+    slip_probability = frozen_lake.slip_probability if frozen_lake.slippery else 0.0
+    probabilities = slip_matrix(num_actions, slip_probability)
+    wins = terminal & (next_state == frozen_lake.goal_state)
+    if objective == "return":
+        reward = step_reward
+    elif objective == "win":
+        reward = wins.astype(float)
+    else:
+        raise ValueError(f"unknown objective {objective}, expected 'return' or 'win'")
+
+    value = np.zeros(num_states)
+    win_probability = np.zeros(num_states)
+    policy = np.zeros((horizon, num_states), dtype=ACTION_DTYPE)
+    for moves_left in range(1, horizon + 1):
+        # value of every actual move, then expected over the slips of every chosen action
+        move_value = reward + np.where(terminal, 0.0, discount * value[next_state])
+        action_value = move_value @ probabilities.T
+        best = np.argmax(action_value, axis=1)
+        move_win = np.where(terminal, wins.astype(float), win_probability[next_state])
+        win_probability = (move_win @ probabilities.T)[np.arange(num_states), best]
+        value = action_value[np.arange(num_states), best]
+        policy[horizon - moves_left] = best
+
+    actions = None if slip_probability else policy[np.arange(horizon), trajectory(frozen_lake, policy)]
+    return ExactSolution(actions, policy, float(value[0]), float(win_probability[0]))
+
+
+def trajectory(frozen_lake, policy) -> np.ndarray:
+    """
+    States visited when following the policy on a deterministic lake, one per policy step.
+    The state stays put once the game is over.
+    """
+    states = np.zeros(len(policy), dtype=np.int64)
+    state, over = 0, False
+    for step in range(len(policy)):
+        states[step] = state
+        action = policy[step, state]
+        if not over:
+            over = bool(frozen_lake.terminal[state, action])
+            if not over:
+                state = frozen_lake.next_state[state, action]
+    return states
+
+
+def solve_exact(frozen_lake, horizon: int = None) -> ExactSolution:
+    """
+    Shortest winning sequence on a deterministic lake, best policy over horizon moves
+    (twice the shortest path by default) on a slippery one.
+    """
+    if not frozen_lake.slippery:
+        return shortest_path(frozen_lake)
+    if horizon is None:
+        horizon = 4 * (frozen_lake.size - 1)
+    return value_iteration(frozen_lake, horizon)
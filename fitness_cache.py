@@ -0,0 +1,61 @@
+"""
+This module holds a bounded memoization cache for gene evaluations.
+On a non-slippery game, playing the same gene always gives the same result, so
+duplicated genes (elites, children of near identical parents, repeated mutations of the best gene)
+do not need to be simulated again.
+"""
+
+from collections import OrderedDict
+
+
+class FitnessCache:
+    """
+    Least recently used cache of gene evaluations, holding at most max_size entries.
+    Keys are the board fingerprint followed by the gene bytes.
+    """
+    def __init__(self, max_size: int = 100_000):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size: int = max_size
+        self.entries = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key: bytes, uses: int = 1):
+        """
+        Return the cached record of the key, or None if the gene was never evaluated.
+        uses is the number of genes served by this lookup: if the key is missing,
+        it is evaluated once and the other uses count as hits.
+        """
+        record = self.entries.get(key)
+        if record is None:
+            self.misses += 1
+            self.hits += uses - 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += uses
+        return record
+
+    def put(self, key: bytes, record):
+        """
+        Store the record of the key, evicting the least recently used entries when full.
+        """
+        self.entries[key] = record
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        return {'size': len(self.entries), 'max_size': self.max_size, 'hits': self.hits,
+                'misses': self.misses, 'evictions': self.evictions}
+
+    def __str__(self):
+        return f"fitness cache: {len(self.entries)}/{self.max_size}, hits: {self.hits}, misses: {self.misses}, evictions: {self.evictions}"
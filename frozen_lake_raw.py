@@ -1,20 +1,84 @@
 """
-This module has the exact same functionality as frozen_lake.py, but it does not use pygame.
+This module holds the game itself, without any rendering, so it never imports pygame.
 We did this to avoid the overhead of pygame and to make the algorithm run faster.
+frozen_lake.py extends it with the pygame visuals and human play.
 """
 
+import hashlib
 import numpy as np
-import random
+from actions import ACTION_SPACE, ACTION_DELTAS, ACTION_SYMBOLS, encode_actions
+
+
+def generate_hole_grids(rng: np.random.Generator, size: int, count: int, hole_probability: float) -> np.ndarray:
+    """
+    Generate count boards at once, as a (count, size, size) boolean grid of holes.
+    Every board gets a random monotone path from the start to the goal, carved free of holes,
+    so it is always solvable: the path goes right or down with the same probability until it
+    reaches the last row or column, and then goes straight to the goal.
+    Every other cell is a hole with probability hole_probability.
+    """
+    last = size - 1
+    coins = rng.random((count, 2 * last)) > 0.5  # True moves right, False moves down
+    rights = np.cumsum(coins, axis=1)
+    downs = np.cumsum(~coins, axis=1)
+    moves = coins
+    if last > 0:
+        # once the path reaches the last row or column, the remaining moves are forced
+        reached = np.argmax((rights >= last) | (downs >= last), axis=1)
+        forced_right = downs[np.arange(count), reached] >= last
+        forced = np.arange(2 * last) > reached[:, None]
+        moves = np.where(forced, forced_right[:, None], coins)
+    start = np.zeros((count, 1), dtype=np.int64)
+    path_rows = np.concatenate((start, np.cumsum(~moves, axis=1)), axis=1)
+    path_cols = np.concatenate((start, np.cumsum(moves, axis=1)), axis=1)
+
+    holes = rng.random((count, size, size)) < hole_probability
+    holes[np.arange(count)[:, None], path_rows, path_cols] = False
+    return holes
+
+
+def build_transition_table(size: int, holes: np.ndarray, goal_pos: tuple, rewards: dict):
+    """
+    Compile a board into flat tables indexed by (state, action), where state = row * size + column.
+    next_state is the cell the action moves into (the same cell for out of bounds moves),
+    step_reward is the reward of the move and terminal flags moves into a hole or into the goal.
+    As in take_action, the player stays on its cell when the move ends the game.
+    """
+    states = np.arange(size * size)
+    rows, cols = np.divmod(states, size)
+    new_rows = rows[:, None] + ACTION_DELTAS[:, 0]
+    new_cols = cols[:, None] + ACTION_DELTAS[:, 1]
+    out_of_bounds = (new_rows < 0) | (new_rows >= size) | (new_cols < 0) | (new_cols >= size)
+    next_state = np.where(out_of_bounds, states[:, None], new_rows * size + new_cols)
+
+    goal = ~out_of_bounds & (next_state == goal_pos[0] * size + goal_pos[1])
+    hole = ~out_of_bounds & ~goal & holes.ravel()[next_state]
+
+    step_reward = np.select(
+        [out_of_bounds, goal, hole],
+        [rewards['out-of-bounds'], rewards['goal'], rewards['hole']],
+        rewards['move'])
+    return next_state, step_reward, goal | hole
+
 
 class FrozenLakeRaw:
-    def __init__(self, size: int = 4, population: list =[], slippery: bool= False):
+    # probability of a hole on every cell out of the guaranteed path
+    hole_probability = 0.3
+
+    def __init__(self, size: int = 4, population: list =[], slippery: bool= False, rng=None, holes=None):
+        # every random draw of the game (board and slips) comes from this generator,
+        # which can be given as a numpy Generator or as a seed
+        self.rng: np.random.Generator = np.random.default_rng(rng)
         self.size: int = size
         self.population: int = population
         self.board = np.zeros((size, size))
         self.player_pos = (0, 0)
         self.goal_pos = (self.size-1, self.size-1)
-        self.hole_positions = self.generate_hole_positions()
-        self.action_space = ['d', 'r', 'u', 'l']
+        # a given (size, size) boolean grid of holes, e.g. from a board corpus, replaces the random board
+        self.holes: np.ndarray = self.generate_holes() if holes is None else np.asarray(holes, dtype=bool)
+        if self.holes.shape != (size, size):
+            raise ValueError(f"holes must be a ({size}, {size}) grid, got {self.holes.shape}")
+        self.action_space = ACTION_SPACE
         self.rewards = {'goal': 100, 'hole': -10, 'move': 1, "out-of-bounds": -0.2}
         self.total_reward = 0.0
         self.game_over = False
@@ -22,59 +86,67 @@ class FrozenLakeRaw:
         self.fitness = 0
         self.best_fitness = 0
         self.slippery = slippery
-        self.ACTIONS = {
-                    'u': (-1, 0),
-                    'd': (1, 0),
-                    'l': (0, -1),
-                    'r': (0, 1),
-                }
-        
-    def generate_hole_positions(self):
-        artificial_path = [(0,0), self.goal_pos]
-        current_pos = (0,0)
-        while current_pos != self.goal_pos:
-            if current_pos[0] == self.goal_pos[0]:
-                current_pos = (current_pos[0], current_pos[1]+1)
-            elif current_pos[1] == self.goal_pos[1]:
-                current_pos = (current_pos[0]+1, current_pos[1])
-            else:
-                if random.random() > 0.5:
-                    current_pos = (current_pos[0], current_pos[1]+1)
-                else:
-                    current_pos = (current_pos[0]+1, current_pos[1])
-            artificial_path.append(current_pos)
-        hole_positions = []
-        for i in range(self.size):
-            for j in range(self.size):
-                if (i,j) not in artificial_path and (i,j) not in artificial_path:
-                    if random.random() < 0.3:
-                        hole_positions.append((i,j))
-        return hole_positions
+        self.slip_probability = 0.3
+        self.ACTIONS = ACTION_DELTAS
+        self.build_transition_table()
+
+    def build_transition_table(self):
+        """
+        Compile the board into the (state, action) tables used to take actions.
+        It must be called again if the holes, the goal or the rewards are changed.
+        """
+        self.goal_state = self.goal_pos[0] * self.size + self.goal_pos[1]
+        self.next_state, self.step_reward, self.terminal = build_transition_table(
+            self.size, self.holes, self.goal_pos, self.rewards)
+        # identifies the board, e.g. to share cached gene evaluations
+        self.board_fingerprint = hashlib.blake2b(
+            self.next_state.tobytes() + self.step_reward.tobytes() + self.terminal.tobytes(),
+            digest_size=16).digest()
+
+    def generate_holes(self) -> np.ndarray:
+        """ 
+        This method generates the holes of the game, as a boolean grid.
+        It generates a path from the start to the goal, and then randomly places holes on the board
+        """
+        return generate_hole_grids(self.rng, self.size, 1, self.hole_probability)[0]
+
+    @property
+    def hole_positions(self) -> list:
+        """
+        The (row, column) positions of the holes.
+        """
+        return [tuple(position) for position in np.argwhere(self.holes).tolist()]
+
+    @hole_positions.setter
+    def hole_positions(self, positions):
+        self.holes = np.zeros((self.size, self.size), dtype=bool)
+        for row, col in positions:
+            self.holes[row, col] = True
+        # the tables and the fingerprint describe the board, so they follow the new holes
+        self.build_transition_table()
 
     def take_action(self, action):
         if self.game_over:
             self.player_pos = (0, 0)
-        new_pos = (self.player_pos[0] + self.ACTIONS[action][0], self.player_pos[1] + self.ACTIONS[action][1])
-
-        if self.slippery and random.random() < 0.3:
-            action = random.choice([a for a in self.action_space if a != action])
-            new_pos = (self.player_pos[0] + self.ACTIONS[action][0], self.player_pos[1] + self.ACTIONS[action][1])
-        if new_pos[0] < 0 or new_pos[0] >= self.size or new_pos[1] < 0 or new_pos[1] >= self.size:
-            self.total_reward += self.rewards['out-of-bounds']  # assign negative reward for out of board move
-        elif new_pos == self.goal_pos and not self.game_over:
-            self.total_reward += self.rewards['goal']
-            self.game_over = True
-            self.won = True
-        elif new_pos in self.hole_positions:
-            self.total_reward += self.rewards['hole']
+        if self.slippery and self.rng.random() < self.slip_probability:
+            # slip to one of the three other actions
+            action = (action + self.rng.integers(1, 4)) % len(self.action_space)
+
+        state = self.player_pos[0] * self.size + self.player_pos[1]
+        next_state = int(self.next_state[state, action])
+        self.total_reward += self.step_reward[state, action]
+        if self.terminal[state, action]:
+            # after a game over the player restarts from (0, 0), which is never next to the goal
             self.game_over = True
-            self.fitness = 0
+            if next_state == self.goal_state:
+                self.won = True
+            else:
+                self.fitness = 0
         else:
-            self.total_reward += self.rewards['move']
-            self.player_pos = new_pos
+            self.player_pos = divmod(next_state, self.size)
 
     def play_auto_agent(self, movements):
-        for mov in movements:
+        for mov in encode_actions(movements):
             reward = self.take_action(mov)
             if self.won:
                 print('Yay')
@@ -95,8 +167,8 @@ class FrozenLakeRaw:
                 action = auto_agent.pop(0)
 
             # take action and update game state
-            if action in self.action_space:
-                reward = self.take_action(action)
+            if action in ACTION_SYMBOLS:
+                reward = self.take_action(encode_actions([action])[0])
                 if self.game_over:
                     print('Game over')
                     break
\ No newline at end of file
@@ -4,30 +4,67 @@ It holds the abstarct and general functions to all other implementatios
 """
 
 import numpy as np
-import pygame
-import random
 import logging
-from frozen_lake import FrozenLake
+from frozen_lake_raw import FrozenLakeRaw
 import abc
+import asyncio
+import time
 
-from objects import Gene, AlgorithmStats
+from actions import ACTION_DTYPE, OPPOSITE_ACTIONS
+from batch_evaluator import evaluate_population
+from fitness_cache import FitnessCache
+from prefix_cache import PrefixStateCache
+from exact_solver import is_solvable
+from objects import AlgorithmStats, PopulationResult, GenerationRecord
+from population import Population
+from variation import one_point_crossover, uniform_crossover, point_mutation, swap_mutation, scramble_mutation
 
 class GeneticAlgorithm:
-    def __init__(self, frozen_lake: FrozenLake,
+    # crossovers of crossover_population, see variation.py
+    crossover_methods = ('one_point', 'uniform')
+
+    def __init__(self, frozen_lake: FrozenLakeRaw,
         population_size: int, gene_length: int,
-        mutation_method =None):
+        mutation_method =None, fitness_cache_size: int = None, rng=None, instrumentation=None,
+        prefix_cache_size: int = None, monte_carlo=None, multi_board=None, crossover_method: str = 'one_point'):
         self.population_size: int = population_size
         self.gene_length: int = gene_length
-        self.frozen_lake: FrozenLake = frozen_lake
-        self.population = []
+        self.frozen_lake: FrozenLakeRaw = frozen_lake
+        self.population = Population.from_genes([])
         self.new_population = []
-        self.best_gene = []
-        self.last_best_gene = []
+        self.best_gene = np.array([], dtype=ACTION_DTYPE)
+        self.last_best_gene = np.array([], dtype=ACTION_DTYPE)
         self.buffer = 0
         self.elite_size = 0.2
         self.generation = 0
+        self.max_generations = 100
         self.stats = AlgorithmStats([], 0)
         self.mutation_method = mutation_method
+        if crossover_method not in self.crossover_methods:
+            raise ValueError(f"crossover_method must be one of {list(self.crossover_methods)}, got {crossover_method!r}")
+        self.crossover_method: str = crossover_method
+        # probability of the default mutation for every new gene, one number or one per row of the new population
+        self.mutation_rate = 0.1
+        # every random draw of the algorithm comes from this generator, given as a numpy Generator or a seed.
+        # The game has its own generator for the board and the slips.
+        self.rng: np.random.Generator = np.random.default_rng(rng)
+        # calculate_gene_fitness stops playing a gene as soon as the game is over
+        self.stop_on_game_over = True
+        # opt-in memoization of gene evaluations, only used on non-slippery games
+        self.fitness_cache = FitnessCache(fitness_cache_size) if fitness_cache_size else None
+        # opt-in cache of the states reached by the prefixes of the last genes played, only used on non-slippery games
+        self.prefix_cache = PrefixStateCache(prefix_cache_size) if prefix_cache_size else None
+        # opt-in MonteCarloFitness, to evaluate genes over many rollouts on slippery games
+        self.monte_carlo = monte_carlo
+        # opt-in MultiBoardFitness, to score genes over a set of boards instead of frozen_lake alone
+        self.multi_board = multi_board
+        # genes evaluated so far, and the last evaluated population with its result, for the generation records
+        self.evaluations = 0
+        self.last_evaluation = None
+        # opt-in per-phase timing and counters, see instrumentation.py
+        self.instrumentation = instrumentation
+        if instrumentation is not None:
+            instrumentation.attach(self)
 
     def avoid_repetitive_gene(self, gene):
         """ 
@@ -46,7 +83,7 @@ class GeneticAlgorithm:
             if self.buffer == 50:
                 self.buffer = 0
                 # delete the last element of the best_gene
-                self.last_best_gene = np.array([])
+                self.last_best_gene = np.array([], dtype=ACTION_DTYPE)
                 self.best_gene = self.best_gene[:-1]
                 logging.info("deleted the last element of the best_gene due to repetitive genes policy")
 
@@ -62,41 +99,256 @@ class GeneticAlgorithm:
                 abs(self.frozen_lake.player_pos[0] - self.frozen_lake.goal_pos[0]) 
                 + abs(self.frozen_lake.player_pos[1] - self.frozen_lake.goal_pos[1]))
             self.frozen_lake.fitness = self.frozen_lake.total_reward / (distance_to_goal + 1) 
-            opposite_actions = {'u': 'd', 'd': 'u', 'l': 'r', 'r': 'l'}
-            for i in range(len(gene)-1):
-                if gene[i+1] == opposite_actions[gene[i]]:
-                    self.frozen_lake.fitness -= opposite_actions_penalty
+            self.frozen_lake.fitness -= opposite_actions_penalty * self.count_opposite_actions(gene)
 
-    def calculate_gene_fitness(self, gene: list[str]) -> int:
+    def count_opposite_actions(self, gene) -> int:
+        """
+        Count how many moves of the gene undo the previous one.
+        """
+        return int(np.count_nonzero(gene[1:] == OPPOSITE_ACTIONS[gene[:-1]]))
+
+    def calculate_gene_fitness(self, gene: np.ndarray) -> int:
         """ 
         This methods calls the calculate_fitness method and returns the fitness of the gene.
-        We use this function due to the issue of having to process the player moves
+        We use this function due to the issue of having to process the player moves.
+        When the game is restarted and the gene was already played, the game state is
+        restored from the fitness cache instead.
         """
+        restarted = (not self.frozen_lake.game_over and self.frozen_lake.total_reward == 0
+                     and tuple(self.frozen_lake.player_pos) == (0, 0))
+        key = self.fitness_cache_key(gene) if restarted else None
+        record = self.fitness_cache.get(key) if key is not None else None
+        if record is not None:
+            (self.frozen_lake.total_reward, self.frozen_lake.won, self.frozen_lake.game_over,
+             self.frozen_lake.player_pos, self.frozen_lake.fitness) = record
+            return self.frozen_lake.fitness
+
         for movement in gene:
             self.frozen_lake.take_action(movement)
-            if self.frozen_lake.game_over:
-                return 0
-        self.calculate_fitness(gene)
+            if self.stop_on_game_over and self.frozen_lake.game_over:
+                break
+        if self.stop_on_game_over and self.frozen_lake.game_over:
+            self.frozen_lake.fitness = 0
+        else:
+            self.calculate_fitness(gene)
+        if key is not None:
+            self.fitness_cache.put(key, (
+                self.frozen_lake.total_reward, self.frozen_lake.won, self.frozen_lake.game_over,
+                tuple(self.frozen_lake.player_pos), self.frozen_lake.fitness))
         return self.frozen_lake.fitness
-        
+
+    def fitness_cache_key(self, gene):
+        """
+        Return the key of the gene in the fitness cache, or None if its evaluation cannot be cached.
+        """
+        if self.fitness_cache is None or self.frozen_lake.slippery:
+            return None
+        return self.frozen_lake.board_fingerprint + np.asarray(gene, dtype=ACTION_DTYPE).tobytes()
+
+    def population_to_matrix(self, population):
+        """
+        Convert a list of genes, possibly of different lengths, into a padded matrix
+        of action codes and the length of each gene. A Population already holds them.
+        """
+        if isinstance(population, Population):
+            return population.matrix()
+        lengths = np.array([len(gene) for gene in population], dtype=np.int64)
+        actions = np.zeros((len(population), lengths.max(initial=0)), dtype=ACTION_DTYPE)
+        if lengths.sum() > 0:
+            actions[np.arange(actions.shape[1]) < lengths[:, None]] = np.concatenate(population)
+        return actions, lengths
+
+    def count_population_opposite_actions(self, actions, lengths):
+        """
+        Count, for every row of the action matrix, how many moves undo the previous one.
+        """
+        undone = actions[:, 1:] == OPPOSITE_ACTIONS[actions[:, :-1]]
+        valid = np.arange(1, actions.shape[1]) < lengths[:, None]
+        return (undone & valid).sum(axis=1)
+
+    def calculate_population_fitness(self, actions, lengths, result: PopulationResult, opposite_actions_penalty: int = 0.8):
+        """
+        Vectorized version of calculate_fitness, applied to a whole population result.
+        """
+        distance_to_goal = np.abs(result.player_pos - np.array(self.frozen_lake.goal_pos)).sum(axis=1)
+        fitness = result.total_reward / (distance_to_goal + 1)
+        return fitness - opposite_actions_penalty * self.count_population_opposite_actions(actions, lengths)
+
+    def simulate_population(self, population) -> PopulationResult:
+        """
+        Play the whole population at once with the batched evaluator and calculate the fitness
+        of every gene, with the same results as calling calculate_gene_fitness gene by gene
+        on a restarted game.
+        On a slippery game with Monte Carlo fitness, the fitness is the mean over many rollouts instead,
+        and with multi-board fitness it aggregates the fitness over every board.
+        """
+        if self.multi_board is not None:
+            return self.multi_board.evaluate(self, population)
+        if self.monte_carlo is not None and self.frozen_lake.slippery:
+            return self.monte_carlo.evaluate(self, population)
+        actions, lengths = self.population_to_matrix(population)
+        result = evaluate_population(self.frozen_lake, actions, lengths, self.stop_on_game_over, self.prefix_cache)
+        result.fitness = self.calculate_population_fitness(actions, lengths, result)
+        if self.stop_on_game_over:
+            result.fitness[result.game_over] = 0
+        return result
+
+    def evaluate_population(self, population) -> PopulationResult:
+        """
+        Evaluate the whole population. On a deterministic lake, the genes of a Population whose evaluation
+        is up to date (e.g. the elites kept from the last generation) keep it and are not played again.
+        """
+        if (not isinstance(population, Population) or self.frozen_lake.slippery or self.multi_board is not None
+                or not population.evaluated.any()):
+            return self.record_evaluation(population, self.evaluate_genes(population))
+        result = population.result()
+        stale = np.flatnonzero(~population.evaluated)
+        if len(stale):
+            fresh = self.evaluate_genes(population.take(stale))
+            for name in ('total_reward', 'won', 'game_over', 'player_pos', 'fitness'):
+                getattr(result, name)[stale] = getattr(fresh, name)
+            result.steps = fresh.steps
+        return self.record_evaluation(population, result)
+
+    def evaluate_genes(self, population) -> PopulationResult:
+        """
+        Evaluate every gene of the population. With the fitness cache enabled, only the distinct genes
+        that were never played on this board are simulated.
+        """
+        if self.fitness_cache is None or self.frozen_lake.slippery or self.multi_board is not None or len(population) == 0:
+            return self.simulate_population(population)
+
+        keys = [self.fitness_cache_key(gene) for gene in population]
+        genes_by_key = {}
+        for key, gene in zip(keys, population):
+            genes_by_key.setdefault(key, []).append(gene)
+        records = {}
+        missing = []
+        for key, genes in genes_by_key.items():
+            record = self.fitness_cache.get(key, uses=len(genes))
+            if record is None:
+                missing.append(key)
+            else:
+                records[key] = record
+
+        if missing:
+            result = self.simulate_population([genes_by_key[key][0] for key in missing])
+            for index, key in enumerate(missing):
+                records[key] = (
+                    float(result.total_reward[index]), bool(result.won[index]), bool(result.game_over[index]),
+                    tuple(int(coordinate) for coordinate in result.player_pos[index]), float(result.fitness[index]))
+                self.fitness_cache.put(key, records[key])
+
+        total_reward, won, game_over, player_pos, fitness = zip(*(records[key] for key in keys))
+        return PopulationResult(np.array(total_reward), np.array(won), np.array(game_over),
+                                np.array(player_pos, dtype=np.int64), np.array(fitness))
+
+    def record_evaluation(self, population, result: PopulationResult) -> PopulationResult:
+        """
+        Count the evaluated genes and keep the population with its result for generation_record.
+        """
+        if isinstance(population, Population):
+            population.set_result(result)
+        self.evaluations += len(population)
+        self.last_evaluation = (population, result)
+        return result
+
     def initialize_population(self):
         """
         Initialize the population with random genes.
         Makes it possible to adapt the probability of each action.
         """
         down_right_prob = [0.25, 0.25, 0.25, 0.25]  # Probabilities for [down, right, up, left]
-        population = []
-        for i in range(self.population_size):
-            gene = np.random.choice(self.frozen_lake.action_space, size=self.gene_length, p=down_right_prob)
-            population.append(gene)
-        return population
+        genes = self.rng.choice(self.frozen_lake.action_space, size=(self.population_size, self.gene_length), p=down_right_prob)
+        return Population(genes)
 
-    @abc.abstractmethod
     def solve(self):
         """
         Solve the problem using the genetic algorithm.
+        We give up after max_generations generations without a winning gene, or right away
+        if the exact solver finds no path to the goal (slips only swap moves, so this holds on slippery lakes too).
+        """
+        for _ in self.iter_generations():
+            pass
+
+    def iter_generations(self, max_generations: int = None, max_seconds: float = None, resume: bool = False):
+        """
+        Solve the problem one generation at a time, yielding a GenerationRecord after every generation.
+        Stops after a win, after max_generations generations (self.max_generations by default),
+        or once max_seconds have passed. The caller can also stop early by leaving the loop;
+        the stats are up to date in every case.
+        With resume, the current population and generation are kept, e.g. after restoring a checkpoint.
+        A run that cannot be won, see solvable, fails at once.
+        """
+        max_generations = self.max_generations if max_generations is None else max_generations
+        start = time.perf_counter()
+        if not resume:
+            self.population = self.initialize_population()
+        try:
+            if not self.solvable():
+                self.generation = max_generations + 1
+                return
+            while True:
+                self.generation += 1
+                if self.generation > max_generations:
+                    return
+                won = self.evolve_generation()
+                record = self.generation_record(won, time.perf_counter() - start)
+                yield record
+                if won or (max_seconds is not None and record.elapsed >= max_seconds):
+                    return
+        finally:
+            self.get_algorithm_stats()
+
+    def solvable(self) -> bool:
+        """
+        Whether a gene can win at all, by the exact solver: on frozen_lake, or on the boards of multi_board.
+        """
+        if self.multi_board is not None:
+            return self.multi_board.solvable()
+        return is_solvable(self.frozen_lake)
+
+    async def aiter_generations(self, max_generations: int = None, max_seconds: float = None, resume: bool = False):
+        """
+        Async version of iter_generations, handing control back to the event loop after every generation,
+        so many solves can run concurrently in one loop.
+        """
+        for record in self.iter_generations(max_generations, max_seconds, resume):
+            yield record
+            await asyncio.sleep(0)
+
+    def generation_record(self, won: bool, elapsed: float) -> GenerationRecord:
+        """
+        Summarize the generation that was just evaluated: the winning gene if any gene won,
+        otherwise the fittest gene of the evaluated population.
+        """
+        population, result = self.last_evaluation
+        if won:
+            best = int(np.flatnonzero(result.won)[0])
+        else:
+            best = int(np.argmax(result.fitness))
+        return GenerationRecord(self.generation, float(result.fitness[best]), population[best].copy(),
+                                self.evaluations, elapsed, won)
+
+    @abc.abstractmethod
+    def evolve_generation(self) -> bool:
+        """
+        Evaluate the current population once, and either keep the winning gene or
+        replace the population with the next generation.
+        Returns True if a gene won the game.
         """
         pass
+
+    def keep_winning_gene(self, result: PopulationResult) -> bool:
+        """
+        If any gene of the evaluated population won the game, keep the first one as the best gene.
+        """
+        winners = np.flatnonzero(result.won)
+        if len(winners) == 0:
+            return False
+        self.best_gene = self.population[winners[0]].copy()
+        self.get_algorithm_stats()
+        return True
     
     @abc.abstractmethod
     def evaluate_gene(self, gene):
@@ -106,41 +358,30 @@ class GeneticAlgorithm:
         """
         pass
 
-    def get_step_gene(self, best_gene):
-        """
-        This is a helper function to handle the duiality of dealing with
-        np arrays and lsists
-        """
-        try:
-            return best_gene.copy().tolist()
-        except AttributeError:
-            return best_gene.copy()
-
-
-    def mutate(self, gene):
+    def mutate(self, gene, row: int = None):
         """
         Mutate the gene based on the specified method. If no method is specified,
-        replace one of the existing actions at random.
+        replace one of the existing actions at random, with the mutation rate of the row of the gene
+        in the new population (row is only needed when mutation_rate has one rate per row).
         """
         if self.mutation_method == "swap":
             try:
-                index1 = random.randint(0, self.gene_length - 1)
-                index2 = random.randint(0, self.gene_length - 1)
+                index1, index2 = self.rng.integers(0, self.gene_length, size=2)
                 gene[index1], gene[index2] = gene[index2], gene[index1]
             except IndexError:
                 return gene
             
         elif self.mutation_method == "scramble":
-            start = random.randint(0, self.gene_length - 1)
-            end = random.randint(start, self.gene_length)
+            start = self.rng.integers(0, self.gene_length)
+            end = self.rng.integers(start, self.gene_length + 1)
             subset = gene[start:end]
-            random.shuffle(subset)
+            self.rng.shuffle(subset)
             gene[start:end] = subset
             
         else:  # Default mutation method
-            if random.random() < 0.1:
+            if self.rng.random() < self.row_mutation_rate(row):
                 try:
-                    gene[random.randint(0, self.gene_length - 1)] = random.choice(self.frozen_lake.action_space)
+                    gene[self.rng.integers(0, self.gene_length)] = self.rng.choice(self.frozen_lake.action_space)
                 except IndexError:
                     pass
                     
@@ -152,23 +393,74 @@ class GeneticAlgorithm:
         Perform crossover between two parents to create a child gene.
         """
         try:
-            crossover_point = np.random.randint(1, self.gene_length - 1)
+            crossover_point = self.rng.integers(1, self.gene_length - 1)
         except ValueError:
             crossover_point = 1
         child = np.concatenate((parent1[:crossover_point], parent2[crossover_point:]))
         return child
 
+    def crossover_population(self, parents1, parents2) -> Population:
+        """
+        Crossover of every pair of genes of the population at parents1 and parents2, building the whole offspring at once:
+        at one point as crossover does, or action by action with the uniform crossover_method.
+        """
+        if self.crossover_method == 'uniform':
+            return uniform_crossover(self.rng, self.population, parents1, parents2)
+        return one_point_crossover(self.rng, self.population, parents1, parents2, self.gene_length)
+
+    def row_mutation_rate(self, rows=None):
+        """
+        The mutation rate of the given rows (an index or a slice) of the new population:
+        mutation_rate itself if it is one number, otherwise its entries for those rows.
+        """
+        rate = np.asarray(self.mutation_rate, dtype=float)
+        if rate.ndim == 0:
+            return self.mutation_rate
+        if rate.shape != (self.population_size,):
+            raise ValueError(f"mutation_rate must be one number or one per gene, shape ({self.population_size},), got {rate.shape}")
+        if rows is None:
+            raise ValueError("the rows of the genes are needed to pick their rates from a per-gene mutation_rate")
+        return rate[rows]
+
+    def mutate_population(self, population: Population, rows=slice(None)) -> Population:
+        """
+        Mutate every gene of the population in place, as mutate does for one gene.
+        rows are the rows of these genes in the new population, all of them by default.
+        """
+        if self.mutation_method == "swap":
+            return swap_mutation(self.rng, population, self.gene_length)
+        if self.mutation_method == "scramble":
+            return scramble_mutation(self.rng, population, self.gene_length)
+        return point_mutation(self.rng, population, self.gene_length, self.frozen_lake.action_space,
+                              self.row_mutation_rate(rows))
+
     @abc.abstractmethod
-    def generate_new_population(self, step_gene):
+    def generate_new_population(self, *args):
         """
-        Generate a new population based on the best gene.
-        We ad a random factor to the gene length, in order to create diversity
+        Generate a new population, either from the best gene or from the fitness of the current population.
         """
         pass
 
+    def solver_settings(self) -> dict:
+        """
+        Constructor arguments that shape the evolution, e.g. to rebuild the solver from a checkpoint.
+        """
+        return {'crossover_method': self.crossover_method}
+
+    def fitness_settings(self) -> dict:
+        """
+        How genes are scored: the Monte Carlo and multi-board settings, and the sizes of the caches,
+        e.g. to check a checkpoint is resumed with the same fitness.
+        """
+        return {'monte_carlo': None if self.monte_carlo is None else self.monte_carlo.settings(),
+                'multi_board': None if self.multi_board is None else self.multi_board.settings(),
+                'fitness_cache_size': None if self.fitness_cache is None else self.fitness_cache.max_size,
+                'prefix_cache_size': None if self.prefix_cache is None else self.prefix_cache.max_nodes}
+
     def get_algorithm_stats(self):
         """
         Return the algorithm stats
         """
-        self.stats = AlgorithmStats(self.best_gene, self.generation)
+        profile = self.instrumentation.snapshot() if self.instrumentation is not None else None
+        self.stats = AlgorithmStats(self.best_gene, self.generation, profile)
         
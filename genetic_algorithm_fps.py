@@ -1,60 +1,57 @@
 """
 This module initializes the GA version in which we use FPS selection method.
 """
-import numpy as np
-import pygame
-import random
-from frozen_lake import FrozenLake
 from general_genetic_algorithm import GeneticAlgorithm
-from objects import Gene, AlgorithmStats
+from objects import Gene
+from selection import SELECTION_METHODS, tournament_contestants
 import sys
 
 class GeneticAlgorithmSolverFPS(GeneticAlgorithm):
     """
     In this implementation, we use FPS selection method to select the parents.
+    selection_method can also be 'sus' (stochastic universal sampling) or 'rank' (linear ranking).
     """
-    def __init__(self, frozen_lake, population_size, gene_length, mutation_method):
-        super().__init__(frozen_lake, population_size, gene_length, mutation_method)
+    # the methods of selection.SELECTION_METHODS that draw parents from the fitness of the whole population
+    selection_methods = ('fps', 'sus', 'rank')
+
+    def __init__(self, frozen_lake, population_size, gene_length, mutation_method, selection_method: str = 'fps',
+                 **kwargs):
+        super().__init__(frozen_lake, population_size, gene_length, mutation_method, **kwargs)
         self.mutation_method = mutation_method
+        if selection_method not in self.selection_methods:
+            raise ValueError(f"selection_method must be one of {list(self.selection_methods)}, got {selection_method!r}")
+        self.selection_method: str = selection_method
+
+    def solver_settings(self) -> dict:
+        return {**super().solver_settings(), 'selection_method': self.selection_method}
 
     def calculate_fitness(self, gene, gene_length_penalty: int = 0.5, opposite_actions_penalty: int = 0.6):
         self.frozen_lake.fitness = self.frozen_lake.total_reward
-        opposite_actions = {'u': 'd', 'd': 'u', 'l': 'r', 'r': 'l'}
-        for i in range(len(gene)-1):
-            if gene[i+1] == opposite_actions[gene[i]]:
-                self.frozen_lake.fitness -= opposite_actions_penalty
+        self.frozen_lake.fitness -= opposite_actions_penalty * self.count_opposite_actions(gene)
+
+    def calculate_population_fitness(self, actions, lengths, result, opposite_actions_penalty: int = 0.6):
+        return result.total_reward - opposite_actions_penalty * self.count_population_opposite_actions(actions, lengths)
 
     def fps_selection(self, fitness_list):
-        # in fitness_list, if fitness is negative, we make it zero
-        fitness_list = [fitness if fitness > 0 else 0 for fitness in fitness_list]
-        total_fitness = sum(fitness_list)
-        if total_fitness == 0:
-            probabilities = [1 / len(fitness_list) for fitness in fitness_list]
-        else:
-            probabilities = [fitness / total_fitness for fitness in fitness_list]
-        indices = np.random.choice(range(len(self.population)), size=round(self.population_size/2), p=probabilities)
-        return indices
+        # negative fitness counts as zero, see selection.fps_probabilities
+        select = SELECTION_METHODS[self.selection_method]
+        return select(self.rng, fitness_list, round(self.population_size/2))
 
-    def generate_new_population(self):
+    def generate_new_population(self, fitness_list):
         """
         Generate a new population based on the best gene.
         We add a random factor to the gene length, in order to create diversity
         """
-        down_right_prob = [0.4, 0.4, 0.1, 0.1]  # Probabilities for [down, right, up, left]
-        fitness_list = [self.calculate_gene_fitness(gene) for gene in self.population]
         selected_indices = self.fps_selection(fitness_list)
-
-        new_population = []
-        for _ in range(self.population_size):
-            parent1_index, parent2_index = np.random.choice(selected_indices, size=2, replace=False)
-            parent1, parent2 = self.population[parent1_index], self.population[parent2_index]
-            child = self.crossover(parent1, parent2)
-            child = self.mutate(child)
-            new_population.append(child.tolist())
-        self.population = new_population
+        # every child has two parents at distinct positions of the selected indices
+        parents = selected_indices[tournament_contestants(self.rng, len(selected_indices), self.population_size, 2)]
+        children = self.crossover_population(parents[:, 0], parents[:, -1])
+        self.population = self.mutate_population(children)
     
 
     def solve_illustrate(self):
+        import pygame
+
         self.population = self.initialize_population()
         while not self.frozen_lake.won:
             self.generation += 1
@@ -62,7 +59,6 @@ class GeneticAlgorithmSolverFPS(GeneticAlgorithm):
                 print(Gene(self.frozen_lake.fitness, gene))
                 for movement in gene:
                     self.frozen_lake.render()
-                    pygame.display.update()
                     self.frozen_lake.take_action(movement)
                     pygame.time.wait(10)
                     if self.frozen_lake.won:
@@ -74,24 +70,14 @@ class GeneticAlgorithmSolverFPS(GeneticAlgorithm):
                         pygame.quit()
                         sys.exit()
                 self.frozen_lake.restart()
-            self.generate_new_population()
+            self.generate_new_population(self.evaluate_population(self.population).fitness)
 
-    def solve(self):
-        self.population = self.initialize_population()
-        while not self.frozen_lake.won:
-            self.generation += 1
-            if self.generation > 100:
-                self.get_algorithm_stats()
-                return
-            for gene in self.population:
-                for movement in gene:
-                    self.frozen_lake.take_action(movement)
-                    if self.frozen_lake.won:
-                        self.best_gene = gene
-                        self.get_algorithm_stats()
-                        return
-                self.frozen_lake.restart()
-            self.generate_new_population()
+    def evolve_generation(self):
+        result = self.evaluate_population(self.population)
+        if self.keep_winning_gene(result):
+            return True
+        self.generate_new_population(result.fitness)
+        return False
 
 #fl = FrozenLake(slippery=False) 
 #solver = GeneticAlgorithmSolverFPS(fl, population_size=10, gene_length=10) 
@@ -1,73 +1,75 @@
 import numpy as np
-import pygame
-import random
 import sys
-from frozen_lake import FrozenLake
 from general_genetic_algorithm import GeneticAlgorithm
-from objects import Gene, AlgorithmStats
+from objects import Gene
+from population import Population
+from selection import tournament_selection
+from variation import point_mutation
 
 
 class GeneticAlgorithmSolverTournament(GeneticAlgorithm):
     """
     In this implementation, we use Tournament selection method to select the parents.
+    Every parent is the best of tournament_size genes, a larger tournament gives a stronger selection pressure.
     """
 
-    def __init__(self, frozen_lake, population_size, gene_length, mutation_method):
-        super().__init__(frozen_lake, population_size, gene_length, mutation_method)
+    def __init__(self, frozen_lake, population_size, gene_length, mutation_method, tournament_size: int = 2,
+                 **kwargs):
+        super().__init__(frozen_lake, population_size, gene_length, mutation_method, **kwargs)
         self.mutation_method = mutation_method
-        
+        self.mutation_rate = 0.5
+        self.tournament_size: int = tournament_size
+        # calculate_gene_fitness plays every movement of the gene, even after the game is over
+        self.stop_on_game_over = False
+
+    def solver_settings(self) -> dict:
+        return {**super().solver_settings(), 'tournament_size': self.tournament_size}
+
     def calculate_fitness(self, gene, gene_length_penalty: int = 0.5, opposite_actions_penalty: int = 0.6):
         self.frozen_lake.fitness = self.frozen_lake.total_reward
-        opposite_actions = {'u': 'd', 'd': 'u', 'l': 'r', 'r': 'l'}
-        for i in range(len(gene)-1):
-            if gene[i+1] == opposite_actions[gene[i]]:
-                self.frozen_lake.fitness -= opposite_actions_penalty
+        self.frozen_lake.fitness -= opposite_actions_penalty * self.count_opposite_actions(gene)
+
+    def calculate_population_fitness(self, actions, lengths, result, opposite_actions_penalty: int = 0.6):
+        return result.total_reward - opposite_actions_penalty * self.count_population_opposite_actions(actions, lengths)
 
-    def mutate(self, gene):
+    def mutate(self, gene, row: int = None):
         """
         Mutate the gene by changing one of the existing actions
         This should be called for the best gene, in order to create mutations on
         about 20% of the population
         """
-        if random.random() < 0.5:
+        if self.rng.random() < self.row_mutation_rate(row):
             try:
-                gene[random.randint(0, self.gene_length - 1)] = random.choice(self.frozen_lake.action_space)
+                gene[self.rng.integers(0, self.gene_length)] = self.rng.choice(self.frozen_lake.action_space)
             except IndexError:
                 pass
         return gene
 
-    def calculate_gene_fitness(self, gene: list[str]) -> int:
-        for movement in gene:
-            self.frozen_lake.take_action(movement)
-        self.calculate_fitness(gene)
-        return self.frozen_lake.fitness
+    def mutate_population(self, population, rows=slice(None)):
+        """
+        Mutate about half of the population, changing one of the existing actions of every mutated gene.
+        """
+        return point_mutation(self.rng, population, self.gene_length, self.frozen_lake.action_space,
+                              self.row_mutation_rate(rows))
 
     def tournament_selection(self, fitness_list):
-        selected_indices = []
-        for i in range(self.population_size):
-            tournament_indices = np.random.choice(range(len(self.population)), size=2, replace=False)
-            tournament_fitness = [fitness_list[i] for i in tournament_indices]
-            selected_indices.append(tournament_indices[np.argmax(tournament_fitness)])
-        return selected_indices
+        return tournament_selection(self.rng, fitness_list, self.population_size, self.tournament_size)
 
-    def generate_new_population(self):
-        fitness_list = [self.calculate_gene_fitness(gene) for gene in self.population]
+    def generate_new_population(self, fitness_list):
         elite_size = int(self.elite_size * self.population_size)
         elite_indices = np.argsort(fitness_list)[::-1][:elite_size]
-        new_population = [self.population[i] for i in elite_indices]
+        elite = self.population.take(elite_indices)
 
         selected_indices = self.tournament_selection(fitness_list)
-
-        for i in range(self.population_size - elite_size):
-            parent1_index, parent2_index = np.random.choice(selected_indices, size=2, replace=True)
-            parent1, parent2 = self.population[parent1_index], self.population[parent2_index]
-            child = self.crossover(parent1, parent2)
-            child = self.mutate(child)
-            new_population.append(child)
-
-        self.population = new_population
+        parents = selected_indices[self.rng.integers(0, len(selected_indices), size=(self.population_size - elite_size, 2))]
+        # the elite keeps the first rows of the new population, the children take the rest
+        children = self.mutate_population(self.crossover_population(parents[:, 0], parents[:, 1]),
+                                          slice(elite_size, None))
+        self.population = Population.concatenate([elite, children])
 
     def solve_illustrate(self):
+        import pygame
+
         self.population = self.initialize_population()
         while not self.frozen_lake.won:
             self.generation += 1
@@ -75,7 +77,6 @@ class GeneticAlgorithmSolverTournament(GeneticAlgorithm):
                 print(Gene(self.frozen_lake.fitness, gene))
                 for movement in gene:
                     self.frozen_lake.render()
-                    pygame.display.update()
                     self.frozen_lake.take_action(movement)
                     pygame.time.wait(10)
                     if self.frozen_lake.won:
@@ -86,24 +87,14 @@ class GeneticAlgorithmSolverTournament(GeneticAlgorithm):
                         pygame.quit()
                         sys.exit()
                 self.frozen_lake.restart()
-            self.generate_new_population()
+            self.generate_new_population(self.evaluate_population(self.population).fitness)
 
-    def solve(self):
-        self.population = self.initialize_population()
-        while not self.frozen_lake.won:
-            self.generation += 1
-            if self.generation > 100:
-                self.get_algorithm_stats()
-                return
-            for gene in self.population:
-                for movement in gene:
-                    self.frozen_lake.take_action(movement)
-                    if self.frozen_lake.won:
-                        self.best_gene = gene
-                        self.get_algorithm_stats()
-                        return
-                self.frozen_lake.restart()
-            self.generate_new_population()
+    def evolve_generation(self):
+        result = self.evaluate_population(self.population)
+        if self.keep_winning_gene(result):
+            return True
+        self.generate_new_population(result.fitness)
+        return False
 
 #fl = FrozenLake(slippery=False) 
 #solver = GeneticAlgorithmSolverTournament(fl, population_size=10, gene_length=10) 
@@ -1,10 +1,9 @@
 import numpy as np
-import pygame
-import random
 import sys
-from frozen_lake import FrozenLake
+from actions import decode_actions
 from general_genetic_algorithm import GeneticAlgorithm
-from objects import Gene, AlgorithmStats
+from objects import Gene
+from population import Population
 
 
 class GeneticAlgorithmSolver(GeneticAlgorithm):
@@ -15,8 +14,8 @@ class GeneticAlgorithmSolver(GeneticAlgorithm):
     Additionally, we add a random factor to the gene length, in order to create diversity.
 
     """
-    def __init__(self, frozen_lake, population_size, gene_length, mutation_method):
-        super().__init__(frozen_lake, population_size, gene_length, mutation_method)
+    def __init__(self, frozen_lake, population_size, gene_length, mutation_method, **kwargs):
+        super().__init__(frozen_lake, population_size, gene_length, mutation_method, **kwargs)
         self.mutation_method = mutation_method
 
     def solve_illustrate(self):
@@ -27,26 +26,20 @@ class GeneticAlgorithmSolver(GeneticAlgorithm):
                 print(Gene(self.frozen_lake.fitness, gene))
                 self.evaluate_gene_illustrate(gene)
                 self.frozen_lake.restart()
-            step_gene = self.get_step_gene(self.best_gene)
+            step_gene = self.best_gene.copy()
             self.generate_new_population(step_gene)
 
-    def solve(self):
-        self.population = self.initialize_population()
-        while not self.frozen_lake.won:
-            self.generation += 1
-            if self.generation > 100:
+    def evolve_generation(self):
+        result = self.evaluate_population(self.population)
+        for gene, won, fitness in zip(self.population, result.won, result.fitness):
+            if won:
+                self.best_gene = gene
                 self.get_algorithm_stats()
-                return
-            for gene in self.population:
-                self.evaluate_gene(gene)
-                if not self.frozen_lake.won:
-                    self.frozen_lake.restart()
-                else:
-                    self.best_gene = gene
-                    self.get_algorithm_stats()
-                    return
-            step_gene = self.get_step_gene(self.best_gene)
-            self.generate_new_population(step_gene)
+                return True
+            self.update_best_gene(gene, fitness)
+        step_gene = self.best_gene.copy()
+        self.generate_new_population(step_gene)
+        return False
 
 
     def generate_new_population(self, step_gene):
@@ -54,33 +47,34 @@ class GeneticAlgorithmSolver(GeneticAlgorithm):
         Generate a new population based on the best gene.
         We add a random factor to the gene length, in order to create diversity
         """
-        self.new_population = []
         down_right_prob = [0.4, 0.4, 0.1, 0.1]  # Probabilities for [down, right, up, left]
-        for _ in range(self.population_size):
-            new_gene = self.get_step_gene(self.mutate(step_gene.copy()))
-            for _ in range(self.gene_length):
-                if len(new_gene) < self.gene_length:
-                    new_move = np.random.choice(self.frozen_lake.action_space, p=down_right_prob)
-                    new_gene.append(new_move)
-            if random.random() < 0.5:
-                new_gene.append(random.choice(self.frozen_lake.action_space))
-            if random.random() < 0.2:
-                new_gene.append(random.choice(self.frozen_lake.action_space))
-            self.new_population.append(new_gene)
-        self.population = self.new_population
+        # the random extensions of the whole generation are drawn at once
+        extend_once = self.rng.random(self.population_size) < 0.5
+        extend_twice = self.rng.random(self.population_size) < 0.2
+        extra_moves = self.rng.choice(self.frozen_lake.action_space, size=(self.population_size, 2))
+        mutated = self.mutate_population(Population(np.tile(step_gene, (self.population_size, 1))))
+        new_moves = self.rng.choice(self.frozen_lake.action_space, size=(self.population_size, max(self.gene_length - len(step_gene), 0)), p=down_right_prob)
+        # the second extra move follows the first one, or takes its place if there is no first one
+        extra_moves[~extend_once, 0] = extra_moves[~extend_once, 1]
+        genes = np.concatenate((mutated.genes, new_moves, extra_moves), axis=1)
+        lengths = genes.shape[1] - 2 + extend_once + extend_twice
+        genes = genes[:, :lengths.max(initial=0)]
+        genes[np.arange(genes.shape[1]) >= lengths[:, None]] = 0
+        self.population = Population(genes, lengths)
             
     def evaluate_gene_illustrate(self, gene):
         """
         Evaluate the gene by playing the game with it, and calculating the fitness.
         This is our implementation of elitism, where we keep the best gene from the population.
         """
-        print(f"gene sequence: {gene}")
+        import pygame
+
+        print(f"gene sequence: {decode_actions(gene)}")
 
         for movement in gene:
             self.frozen_lake.render()
             if not self.frozen_lake.game_over:
                 self.frozen_lake.take_action(movement)
-                pygame.display.update()
                 pygame.time.wait(100)
             if self.frozen_lake.won:
                 self.best_gene = gene
@@ -89,13 +83,13 @@ class GeneticAlgorithmSolver(GeneticAlgorithm):
                 pygame.quit()
                 sys.exit()
         self.calculate_fitness(gene)
-        print(f"Evaluated Gene: {gene}, with fitness: {str(self.frozen_lake.fitness)}. The current best gene is: {self.best_gene} with fitness: {str(self.frozen_lake.best_fitness)}")  
+        print(f"Evaluated Gene: {decode_actions(gene)}, with fitness: {str(self.frozen_lake.fitness)}. The current best gene is: {decode_actions(self.best_gene)} with fitness: {str(self.frozen_lake.best_fitness)}")  
     
         if self.frozen_lake.fitness >= self.frozen_lake.best_fitness:
             self.frozen_lake.best_fitness = self.frozen_lake.fitness
             self.best_gene = gene
             self.avoid_repetitive_gene(self.best_gene)
-            print(f"New best gene updated to: {self.best_gene} with fitness: {self.frozen_lake.best_fitness}")
+            print(f"New best gene updated to: {decode_actions(self.best_gene)} with fitness: {self.frozen_lake.best_fitness}")
         else:
             self.avoid_repetitive_gene(self.best_gene)
         
@@ -104,15 +98,19 @@ class GeneticAlgorithmSolver(GeneticAlgorithm):
         Evaluate the gene by playing the game with it, and calculating the fitness.
         This is our implementation of elitism, where we keep the best gene from the population.
         """
-        for movement in gene:
-            self.frozen_lake.take_action(movement)
-            if self.frozen_lake.won:
-                self.best_gene = gene
-                self.get_algorithm_stats()
-                return
-        self.calculate_fitness(gene)
-        if self.frozen_lake.fitness >= self.frozen_lake.best_fitness:
-            self.frozen_lake.best_fitness = self.frozen_lake.fitness
+        fitness = self.calculate_gene_fitness(gene)
+        if self.frozen_lake.won:
+            self.best_gene = gene
+            self.get_algorithm_stats()
+            return
+        self.update_best_gene(gene, fitness)
+
+    def update_best_gene(self, gene, fitness):
+        """
+        Keep the gene as the best gene if its fitness is at least as good as the best one so far.
+        """
+        if fitness >= self.frozen_lake.best_fitness:
+            self.frozen_lake.best_fitness = fitness
             self.best_gene = gene
             self.avoid_repetitive_gene(self.best_gene)
         else:
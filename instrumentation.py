@@ -0,0 +1,172 @@
+"""
+This module measures where the time of a GA goes.
+An Instrumentation attached to a solver wraps its methods on that instance only, and records the wall time
+and call count of every phase (evaluation, selection, crossover, mutate and rebuild of the population),
+the environment steps played, and the evaluations skipped thanks to the fitness cache or to up-to-date genes.
+A solver without instrumentation runs its methods unwrapped, so disabled instrumentation costs nothing.
+Phase times are exclusive: the time of rebuild does not include the selection, crossover and mutate calls it makes.
+Solvers can share a game: its take_action is wrapped once, whatever the number of instrumentations attached to it,
+and a step is counted by the instrumentation whose solver is in a measured call.
+
+    instrumentation = Instrumentation(callback=print, every=10)
+    solver = GeneticAlgorithmSolverFPS(frozen_lake, 10, 8, None, instrumentation=instrumentation)
+    solver.solve()
+    print(instrumentation.to_json())
+"""
+
+import functools
+import json
+import time
+import weakref
+
+# solver methods measured by each phase
+PHASES = {
+    'evaluate_population': 'evaluation',
+    'calculate_gene_fitness': 'evaluation',
+    'fps_selection': 'selection',
+    'tournament_selection': 'selection',
+    'crossover': 'crossover',
+    'crossover_population': 'crossover',
+    'mutate': 'mutate',
+    'mutate_population': 'mutate',
+    'generate_new_population': 'rebuild',
+}
+
+# the instrumentations attached to every game whose take_action is wrapped
+GAME_INSTRUMENTATIONS = weakref.WeakKeyDictionary()
+
+
+class Instrumentation:
+    def __init__(self, callback=None, every: int = 1):
+        # callback receives a snapshot every `every` generations
+        self.callback = callback
+        self.every = every
+        self.solver = None
+        self.reset()
+
+    def reset(self):
+        self.seconds = dict.fromkeys(sorted(set(PHASES.values())), 0.0)
+        self.calls = dict.fromkeys(self.seconds, 0)
+        self.generations = 0
+        self.env_steps = 0
+        self.evaluations = 0
+        self.simulated = 0
+        # time spent in nested measured calls, one entry per measured call in progress
+        self.nested = []
+
+    def attach(self, solver):
+        """
+        Wrap the methods of the solver, and the take_action method of its game, on these instances only.
+        """
+        self.solver = solver
+        for name, phase in PHASES.items():
+            if hasattr(solver, name):
+                setattr(solver, name, self.timed(phase, getattr(solver, name)))
+        solver.evaluate_population = self.counted_population(solver.evaluate_population)
+        solver.calculate_gene_fitness = self.counted_gene(solver.calculate_gene_fitness)
+        solver.simulate_population = self.counted_simulation(solver.simulate_population)
+        solver.evolve_generation = self.counted_generation(solver.evolve_generation)
+        frozen_lake = solver.frozen_lake
+        if frozen_lake not in GAME_INSTRUMENTATIONS:
+            GAME_INSTRUMENTATIONS[frozen_lake] = []
+            frozen_lake.take_action = counted_step(frozen_lake, frozen_lake.take_action)
+        GAME_INSTRUMENTATIONS[frozen_lake].append(self)
+
+    def detach(self):
+        """
+        Restore the original methods of the solver, and of its game once no other instrumentation uses it.
+        """
+        for name in (*PHASES, 'simulate_population', 'evolve_generation'):
+            self.solver.__dict__.pop(name, None)
+        frozen_lake = self.solver.frozen_lake
+        instrumentations = GAME_INSTRUMENTATIONS.get(frozen_lake, [])
+        if self in instrumentations:
+            instrumentations.remove(self)
+        if not instrumentations:
+            GAME_INSTRUMENTATIONS.pop(frozen_lake, None)
+            frozen_lake.__dict__.pop('take_action', None)
+        self.solver = None
+
+    def timed(self, phase: str, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            self.nested.append(0.0)
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                self.seconds[phase] += elapsed - self.nested.pop()
+                self.calls[phase] += 1
+                if self.nested:
+                    self.nested[-1] += elapsed
+        return wrapper
+
+    def counted_population(self, method):
+        @functools.wraps(method)
+        def wrapper(population):
+            self.evaluations += len(population)
+            return method(population)
+        return wrapper
+
+    def counted_gene(self, method):
+        @functools.wraps(method)
+        def wrapper(gene):
+            self.evaluations += 1
+            env_steps = self.env_steps
+            fitness = method(gene)
+            # the gene was played unless its record came from the fitness cache
+            self.simulated += self.env_steps > env_steps
+            return fitness
+        return wrapper
+
+    def counted_simulation(self, method):
+        @functools.wraps(method)
+        def wrapper(population):
+            result = method(population)
+            self.simulated += len(population)
+            self.env_steps += result.steps
+            return result
+        return wrapper
+
+    def counted_generation(self, method):
+        @functools.wraps(method)
+        def wrapper():
+            won = method()
+            self.generations += 1
+            if self.callback is not None and (won or self.generations % self.every == 0):
+                self.callback(self.snapshot())
+            return won
+        return wrapper
+
+    def snapshot(self) -> dict:
+        """
+        Everything recorded so far, as plain JSON-serializable values.
+        """
+        snapshot = {
+            'generations': self.generations,
+            'phases': {phase: {'seconds': self.seconds[phase], 'calls': self.calls[phase]} for phase in self.seconds},
+            'env_steps': self.env_steps,
+            'evaluations': self.evaluations,
+            'evaluations_simulated': self.simulated,
+            'evaluations_skipped': self.evaluations - self.simulated,
+        }
+        if self.solver is not None and self.solver.fitness_cache is not None:
+            snapshot['fitness_cache'] = self.solver.fitness_cache.stats()
+        return snapshot
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.snapshot(), **kwargs)
+
+
+def counted_step(frozen_lake, method):
+    """
+    Wrap take_action of a game, counting every step for the instrumentations of the game in a measured call.
+    """
+    @functools.wraps(method)
+    def wrapper(action):
+        for instrumentation in GAME_INSTRUMENTATIONS.get(frozen_lake, ()):
+            if instrumentation.nested:
+                instrumentation.env_steps += 1
+        return method(action)
+    return wrapper
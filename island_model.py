@@ -0,0 +1,175 @@
+"""
+In this module we run several populations of the same GA on one board, each in its own process (island model).
+Islands evolve independently and, every migration_interval generations, send copies of their best genes
+to the next island of a ring, which replace its worst genes. As soon as one island wins the game,
+every other island stops, so a whole machine can be used on a single large or slippery lake.
+
+    python island_model.py --size 8 --slippery --islands 8 --solver fps
+"""
+
+import argparse
+import os
+import queue
+import multiprocessing
+
+import numpy as np
+
+from frozen_lake_raw import FrozenLakeRaw
+from objects import AlgorithmStats, IslandResult
+from solvers import SOLVERS
+
+
+def emigrate(solver, count: int):
+    """
+    Copies of the count best genes of the population evaluated by the last generation.
+    The evaluation evolve_generation already did is reused, so migration never plays the genes again
+    (and never draws slips from the game generator).
+    """
+    population, result = solver.last_evaluation
+    # winning genes first: under stop_on_game_over a won game scores 0
+    order = np.lexsort((result.fitness, result.won))[::-1][:count]
+    return [population[index].copy() for index in order]
+
+
+def immigrate(solver, migrants):
+    """
+    Replace genes of the next generation with the migrants: first the genes that were not evaluated yet,
+    then the least fit ones, so the elites kept by the solver are replaced last.
+    """
+    population = solver.population
+    fitness = np.where(population.evaluated, population.fitness, -np.inf)
+    population.replace(np.argsort(fitness, kind="stable")[:len(migrants)], migrants)
+
+
+def run_island(island: int, solver_class, game_class, board: dict, solver_args: dict, seed,
+               migration_interval: int, migration_size: int, inbox, outbox, stop, results):
+    """
+    Evolve one island until it wins, gives up after max_generations, or another island won.
+    Migrants are sent to outbox and the ones waiting in inbox are taken in without blocking,
+    so a slow island never holds the others back.
+    If the island fails, the error is sent to results instead, and every island is stopped.
+    """
+    # this process only writes to outbox: do not wait on exit for migrants the next island will never read
+    outbox.cancel_join_thread()
+    try:
+        won, best_gene, generation = evolve_island(solver_class, game_class, board, solver_args, seed,
+                                                   migration_interval, migration_size, inbox, outbox, stop)
+    except Exception as error:
+        stop.set()
+        results.put((island, False, None, None, f"{type(error).__name__}: {error}"))
+        return
+    results.put((island, won, best_gene, generation, None))
+
+
+def evolve_island(solver_class, game_class, board: dict, solver_args: dict, seed,
+                  migration_interval: int, migration_size: int, inbox, outbox, stop):
+    """
+    Body of run_island, solving one generation at a time with iter_generations and migrating between generations.
+    Returns whether the island won, its best gene and its last generation.
+    """
+    game_seed, solver_seed = seed.spawn(2)
+    frozen_lake = game_class(rng=np.random.default_rng(game_seed), **board)
+    solver_args = dict(solver_args)
+    max_generations = solver_args.pop('max_generations', None)
+    solver = solver_class(frozen_lake, rng=np.random.default_rng(solver_seed), **solver_args)
+    if max_generations is not None:
+        solver.max_generations = max_generations
+
+    won = False
+    generations = solver.iter_generations()
+    try:
+        for record in generations:
+            if record.won:
+                won = True
+                stop.set()
+                break
+            if stop.is_set():
+                break
+            if record.generation % migration_interval == 0:
+                # the next generation is already built, the migrants join it before it is evaluated
+                outbox.put(emigrate(solver, migration_size))
+                migrants = []
+                try:
+                    while True:
+                        migrants.extend(inbox.get_nowait())
+                except queue.Empty:
+                    pass
+                immigrate(solver, migrants[-migration_size:])
+    finally:
+        # updates the stats of the solver
+        generations.close()
+    return won, solver.stats.best_gene, solver.stats.generation
+
+
+def solve_islands(frozen_lake, solver_class, islands: int = None, population_size: int = 10, gene_length: int = 10,
+                  mutation_method=None, migration_interval: int = 5, migration_size: int = 2,
+                  max_generations: int = None, seed=None, **solver_kwargs) -> IslandResult:
+    """
+    Solve the board of frozen_lake with islands populations of solver_class (one per core by default).
+    Every island plays its own copy of the board, with its own generators derived from seed.
+    Returns the stats of every island and the index of the first island that won.
+    """
+    islands = islands or os.cpu_count() or 1
+    board = {'size': frozen_lake.size, 'slippery': frozen_lake.slippery, 'holes': frozen_lake.holes}
+    solver_args = {'population_size': population_size, 'gene_length': gene_length,
+                   'mutation_method': mutation_method, 'max_generations': max_generations, **solver_kwargs}
+    seeds = np.random.SeedSequence(seed).spawn(islands)
+
+    context = multiprocessing.get_context()
+    stop = context.Event()
+    results = context.Queue()
+    # island i sends its best genes to island i + 1, around a ring
+    inboxes = [context.Queue() for _ in range(islands)]
+    processes = [
+        context.Process(target=run_island, args=(
+            island, solver_class, type(frozen_lake), board, solver_args, seeds[island],
+            migration_interval, migration_size, inboxes[island], inboxes[(island + 1) % islands], stop, results))
+        for island in range(islands)]
+    for process in processes:
+        process.start()
+
+    winner = None
+    island_stats = [None] * islands
+    try:
+        reported = 0
+        while reported < islands:
+            try:
+                island, won, best_gene, generation, error = results.get(timeout=1)
+            except queue.Empty:
+                # an island killed before it could report would otherwise be waited for forever
+                if any(process.exitcode not in (None, 0) for process in processes):
+                    raise RuntimeError("an island process died without reporting its result")
+                continue
+            if error is not None:
+                raise RuntimeError(f"island {island} failed: {error}")
+            reported += 1
+            island_stats[island] = AlgorithmStats(best_gene, generation)
+            if won and winner is None:
+                winner = island
+    finally:
+        stop.set()
+        for process in processes:
+            process.join()
+    return IslandResult(winner, island_stats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve one frozen lake with several GA populations in parallel")
+    parser.add_argument("--solver", choices=sorted(SOLVERS), default="fps")
+    parser.add_argument("--islands", type=int, default=None, help="number of populations (default: number of cores)")
+    parser.add_argument("--size", type=int, default=4)
+    parser.add_argument("--slippery", action="store_true")
+    parser.add_argument("--population-size", type=int, default=10)
+    parser.add_argument("--gene-length", type=int, default=10)
+    parser.add_argument("--migration-interval", type=int, default=5)
+    parser.add_argument("--migration-size", type=int, default=2)
+    parser.add_argument("--max-generations", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    seed = np.random.SeedSequence(args.seed)
+    frozen_lake = FrozenLakeRaw(size=args.size, slippery=args.slippery, rng=np.random.default_rng(seed.spawn(1)[0]))
+    result = solve_islands(frozen_lake, SOLVERS[args.solver], args.islands, args.population_size, args.gene_length,
+                           migration_interval=args.migration_interval, migration_size=args.migration_size,
+                           max_generations=args.max_generations, seed=args.seed)
+    print(result)
@@ -0,0 +1,87 @@
+"""
+This module evaluates genes on a slippery lake over many rollouts instead of a single noisy one.
+Rollouts are played in batches through the batched evaluator, so the slips of a whole batch are drawn at once.
+Sampling is adaptive (racing): after every batch, the genes whose confidence interval cannot reach the elite
+of the population, or is already narrow enough, stop being sampled, and the remaining budget goes to the close contenders.
+The fitness of a gene is its mean fitness over its rollouts, and the variance is reported with it.
+"""
+
+import numpy as np
+
+from batch_evaluator import evaluate_population
+from objects import PopulationResult
+
+
+class MonteCarloFitness:
+    def __init__(self, batch: int = 8, max_rollouts: int = 64, confidence: float = 2.0,
+                 tolerance: float = 1.0, win_rate: float = None):
+        # rollouts per gene and per round, and at most max_rollouts per gene
+        self.batch: int = batch
+        self.max_rollouts: int = max_rollouts
+        # width of the confidence intervals, in standard errors
+        self.confidence: float = confidence
+        # genes whose mean fitness is known within tolerance are not sampled anymore
+        self.tolerance: float = tolerance
+        # a gene wins the game if it reaches the goal in at least this fraction of its rollouts.
+        # By default it wins if its first rollout does, so the game is solved under the same rule as with a single rollout
+        self.win_rate: float = win_rate
+
+    def settings(self) -> dict:
+        """
+        The constructor arguments, e.g. to save them in a checkpoint.
+        """
+        return {'batch': self.batch, 'max_rollouts': self.max_rollouts, 'confidence': self.confidence,
+                'tolerance': self.tolerance, 'win_rate': self.win_rate}
+
+    def evaluate(self, solver, population) -> PopulationResult:
+        """
+        Race the population on the slippery game of the solver, scoring every rollout with the fitness of the solver.
+        """
+        frozen_lake = solver.frozen_lake
+        actions, lengths = solver.population_to_matrix(population)
+        population_size = len(population)
+        elite = min(population_size, max(1, int(solver.elite_size * population_size)))
+
+        rollouts = np.zeros(population_size, dtype=np.int64)
+        fitness_sum = np.zeros(population_size)
+        fitness_squares = np.zeros(population_size)
+        reward_sum = np.zeros(population_size)
+        wins = np.zeros(population_size)
+        game_overs = np.zeros(population_size)
+        player_pos = np.zeros((population_size, 2), dtype=np.int64)
+        first_won = np.zeros(population_size, dtype=bool)
+        steps = 0
+
+        sampled = np.arange(population_size)
+        while sampled.size:
+            genes = np.repeat(sampled, self.batch)
+            result = evaluate_population(frozen_lake, actions[genes], lengths[genes], solver.stop_on_game_over)
+            fitness = solver.calculate_population_fitness(actions[genes], lengths[genes], result)
+            if solver.stop_on_game_over:
+                fitness[result.game_over] = 0
+            if not rollouts.any():
+                first_won = result.won[::self.batch].copy()
+            rollouts[sampled] += self.batch
+            fitness_sum += np.bincount(genes, fitness, population_size)
+            fitness_squares += np.bincount(genes, fitness * fitness, population_size)
+            reward_sum += np.bincount(genes, result.total_reward, population_size)
+            wins += np.bincount(genes, result.won, population_size)
+            game_overs += np.bincount(genes, result.game_over, population_size)
+            player_pos[genes] = result.player_pos
+            steps += result.steps
+
+            mean = fitness_sum / rollouts
+            variance = np.maximum(fitness_squares / rollouts - mean * mean, 0) * rollouts / np.maximum(rollouts - 1, 1)
+            margin = self.confidence * np.sqrt(variance / rollouts)
+            # a gene is still a contender while its upper bound reaches the lower bound of the elite-th best gene
+            threshold = np.partition(mean - margin, population_size - elite)[population_size - elite]
+            contenders = (mean + margin >= threshold) & (margin > self.tolerance) & (rollouts < self.max_rollouts)
+            sampled = np.flatnonzero(contenders)
+
+        win_rate = wins / np.maximum(rollouts, 1)
+        won = first_won if self.win_rate is None else (wins > 0) & (win_rate >= self.win_rate)
+        return PopulationResult(reward_sum / np.maximum(rollouts, 1), won,
+                                game_overs / np.maximum(rollouts, 1) >= 0.5, player_pos,
+                                fitness=fitness_sum / np.maximum(rollouts, 1), steps=steps,
+                                fitness_variance=variance if population_size else np.zeros(0),
+                                rollouts=rollouts, win_rate=win_rate)
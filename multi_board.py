@@ -0,0 +1,100 @@
+"""
+This module scores genes over a set of boards instead of the single board of the solver, to evolve genes that
+play well on any lake of a kind rather than genes overfit to one lake.
+The whole genes x boards product is played in one vectorized pass by the batched evaluator, every game is scored
+with the fitness of the solver, and the fitness of a gene aggregates its fitness over the boards:
+its mean, its minimum (worst board) or a quantile.
+
+    boards = MultiBoardFitness.from_corpus(BoardCorpus("boards.npy"), count=256, rng=0)
+    solver = GeneticAlgorithmSolverFPS(frozen_lake, 100, 20, None, multi_board=boards)
+"""
+
+import hashlib
+
+import numpy as np
+
+from batch_evaluator import evaluate_boards
+from exact_solver import is_solvable
+from objects import PopulationResult
+
+AGGREGATES = ('mean', 'min', 'quantile')
+
+
+class MultiBoardFitness:
+    def __init__(self, lakes, aggregate: str = 'mean', quantile: float = 0.25, win_rate: float = 1.0):
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"aggregate must be one of {AGGREGATES}, got {aggregate!r}")
+        if not len(lakes):
+            raise ValueError("at least one board is needed")
+        self.lakes: list = list(lakes)
+        self.aggregate: str = aggregate
+        # quantile of the fitness over the boards, when aggregate is 'quantile'
+        self.quantile: float = quantile
+        # a gene wins the game if it reaches the goal on at least this fraction of the boards
+        self.win_rate: float = win_rate
+
+    @classmethod
+    def from_corpus(cls, corpus, indices=None, count: int = None, rng=None, **kwargs) -> "MultiBoardFitness":
+        """
+        Score genes on boards of a BoardCorpus: the given indices, or count boards sampled without replacement,
+        every board of the corpus, in order, when neither is given.
+        """
+        if indices is None and count is None:
+            indices = range(len(corpus))
+        elif indices is None:
+            indices = np.random.default_rng(rng).choice(len(corpus), size=min(count, len(corpus)), replace=False)
+        return cls([corpus.lake(int(index)) for index in indices], **kwargs)
+
+    def __len__(self):
+        return len(self.lakes)
+
+    def settings(self) -> dict:
+        """
+        The aggregation and a fingerprint of the boards, e.g. to check a checkpoint is resumed on the same boards.
+        """
+        boards = hashlib.blake2b(b"".join(lake.board_fingerprint + bytes([lake.slippery]) for lake in self.lakes),
+                                 digest_size=16).hexdigest()
+        return {'aggregate': self.aggregate, 'quantile': self.quantile, 'win_rate': self.win_rate,
+                'boards': len(self.lakes), 'fingerprint': boards}
+
+    def solvable(self) -> bool:
+        """
+        Whether a gene can win at all: the goal must be reachable on at least win_rate of the boards.
+        """
+        solvable = np.array([is_solvable(lake) for lake in self.lakes])
+        return bool(solvable.any()) and solvable.mean() >= self.win_rate
+
+    def aggregate_fitness(self, board_fitness) -> np.ndarray:
+        """
+        Fitness of every gene, from its (genes, boards) fitness matrix.
+        """
+        if self.aggregate == 'min':
+            return board_fitness.min(axis=1)
+        if self.aggregate == 'quantile':
+            return np.quantile(board_fitness, self.quantile, axis=1)
+        return board_fitness.mean(axis=1)
+
+    def evaluate(self, solver, population) -> PopulationResult:
+        """
+        Play the population on every board, scoring every game with the fitness of the solver.
+        Slips, on slippery boards, come from the generator of the game of the solver.
+        Rewards, wins and game overs are averaged over the boards, player positions are those on the first board.
+        """
+        actions, lengths = solver.population_to_matrix(population)
+        population_size, boards = len(population), len(self.lakes)
+        result = evaluate_boards(self.lakes, actions, lengths, solver.stop_on_game_over, solver.frozen_lake.rng)
+        genes = np.repeat(np.arange(population_size), boards)
+        fitness = solver.calculate_population_fitness(actions[genes], lengths[genes], result)
+        if solver.stop_on_game_over:
+            # a game lost in a hole scores 0 as on a single board, but a game won on one board
+            # does not end the run, so it keeps the fitness of reaching the goal
+            fitness[result.game_over & ~result.won] = 0
+
+        board_fitness = fitness.reshape(population_size, boards)
+        win_rate = result.won.reshape(population_size, boards).mean(axis=1)
+        return PopulationResult(result.total_reward.reshape(population_size, boards).mean(axis=1),
+                                (win_rate > 0) & (win_rate >= self.win_rate),
+                                result.game_over.reshape(population_size, boards).mean(axis=1) >= 0.5,
+                                result.player_pos[::boards],
+                                fitness=self.aggregate_fitness(board_fitness), steps=result.steps,
+                                fitness_variance=board_fitness.var(axis=1), win_rate=win_rate)
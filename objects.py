@@ -1,18 +1,90 @@
+import numpy as np
+
+from actions import decode_actions
+
+
 class AlgorithmStats:
-    def __init__(self, best_gene: list, generation: int):
+    __slots__ = ('best_gene', 'generation', 'profile')
+
+    def __init__(self, best_gene: np.ndarray, generation: int, profile: dict = None):
         self.best_gene = best_gene
         self.generation = generation
+        # instrumentation snapshot of the solve, if the solver was instrumented
+        self.profile = profile
 
     def __str__(self):
-        return f"best gene: {self.best_gene}, generation: {self.generation}"
+        return f"best gene: {decode_actions(self.best_gene)}, generation: {self.generation}"
 
 
 class Gene:
-    def __init__(self, gene_fitness: int, gene: list):
+    # the gene may be a view of a row of a Population
+    __slots__ = ('gene_fitness', 'gene')
+
+    def __init__(self, gene_fitness: int, gene: np.ndarray):
         self.gene_fitness: int = gene_fitness
-        self.gene: list = gene
+        self.gene: np.ndarray = gene
     
     def __str__(self):
-        return f"gene: {self.gene}, fitness: {self.gene_fitness}"
+        return f"gene: {decode_actions(self.gene)}, fitness: {self.gene_fitness}"
+
+
+class PopulationResult:
+    def __init__(self, total_reward, won, game_over, player_pos, fitness=None, steps: int = 0,
+                 fitness_variance=None, rollouts=None, win_rate=None):
+        self.total_reward = total_reward
+        self.won = won
+        self.game_over = game_over
+        self.player_pos = player_pos
+        self.fitness = fitness
+        # environment steps played to get this result
+        self.steps: int = steps
+        # Monte Carlo evaluations only: variance of the fitness, rollouts played and fraction of them won, per gene
+        self.fitness_variance = fitness_variance
+        self.rollouts = rollouts
+        self.win_rate = win_rate
+
+    def __str__(self):
+        return f"genes: {len(self.won)}, won: {int(self.won.sum())}, game over: {int(self.game_over.sum())}"
+
+
+class ExactSolution:
+    def __init__(self, actions, policy, expected_return: float, win_probability: float):
+        self.actions = actions
+        self.policy = policy
+        self.expected_return = expected_return
+        self.win_probability = win_probability
+
+    def __str__(self):
+        actions = decode_actions(self.actions) if self.actions is not None else None
+        return f"actions: {actions}, expected return: {self.expected_return}, win probability: {self.win_probability}"
+
 
+class IslandResult:
+    def __init__(self, winner, island_stats: list):
+        # index of the island that won first, or None if every island gave up
+        self.winner = winner
+        self.island_stats: list = island_stats
+
+    @property
+    def stats(self) -> AlgorithmStats:
+        return self.island_stats[self.winner if self.winner is not None else 0]
+
+    def __str__(self):
+        return f"winner: island {self.winner}, {self.stats}"
 
+
+class GenerationRecord:
+    def __init__(self, generation: int, best_fitness: float, best_gene: np.ndarray, evaluations: int,
+                 elapsed: float, won: bool):
+        self.generation = generation
+        self.best_fitness = best_fitness
+        self.best_gene = best_gene
+        # genes evaluated since the solve started, and seconds since it started
+        self.evaluations = evaluations
+        self.elapsed = elapsed
+        self.won = won
+
+    def __str__(self):
+        return (f"generation: {self.generation}, best fitness: {self.best_fitness}, "
+                f"best gene: {decode_actions(self.best_gene)}, evaluations: {self.evaluations}, "
+                f"elapsed: {self.elapsed:.3f}s, won: {self.won}")
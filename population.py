@@ -0,0 +1,121 @@
+"""
+This module holds the population of a GA as a structure of arrays instead of a list of genes:
+a contiguous (individuals, width) matrix of action codes, the length of every gene, the last evaluation of every gene
+(fitness, total reward, won, game over and player position) and a mask of the genes whose evaluation is up to date.
+On a deterministic lake, GeneticAlgorithm.evaluate_population only plays the genes that are not up to date,
+e.g. the children of a generation but not the elites it kept.
+A population still behaves like a list of genes (len, indexing, iteration, item assignment), where every gene
+is a view of its row, so selection, elitism and replacement are index operations on the arrays.
+"""
+
+import numpy as np
+
+from actions import ACTION_DTYPE
+from objects import Gene, PopulationResult
+
+
+class Population:
+    __slots__ = ('genes', 'lengths', 'fitness', 'evaluated', 'total_reward', 'won', 'game_over', 'player_pos')
+    # the per-gene arrays, taken and concatenated along with the genes
+    columns = ('lengths', 'fitness', 'evaluated', 'total_reward', 'won', 'game_over', 'player_pos')
+
+    def __init__(self, genes, lengths=None, fitness=None, evaluated=None):
+        self.genes: np.ndarray = np.asarray(genes, dtype=ACTION_DTYPE)
+        count = len(self.genes)
+        self.lengths: np.ndarray = (np.full(count, self.genes.shape[1], dtype=np.int64) if lengths is None
+                                    else np.asarray(lengths, dtype=np.int64))
+        self.fitness: np.ndarray = np.zeros(count) if fitness is None else np.asarray(fitness, dtype=float)
+        # False for the genes that were never evaluated, or that were replaced since
+        self.evaluated: np.ndarray = np.zeros(count, dtype=bool) if evaluated is None else np.asarray(evaluated, dtype=bool)
+        self.total_reward: np.ndarray = np.zeros(count)
+        self.won: np.ndarray = np.zeros(count, dtype=bool)
+        self.game_over: np.ndarray = np.zeros(count, dtype=bool)
+        self.player_pos: np.ndarray = np.zeros((count, 2), dtype=np.int64)
+
+    @classmethod
+    def from_genes(cls, genes) -> "Population":
+        """
+        Build a population from a sequence of genes of possibly different lengths.
+        """
+        if isinstance(genes, Population):
+            return genes
+        lengths = np.fromiter((len(gene) for gene in genes), dtype=np.int64, count=len(genes))
+        matrix = np.zeros((len(genes), lengths.max(initial=0)), dtype=ACTION_DTYPE)
+        if lengths.sum() > 0:
+            matrix[np.arange(matrix.shape[1]) < lengths[:, None]] = np.concatenate(genes)
+        return cls(matrix, lengths)
+
+    @classmethod
+    def concatenate(cls, populations) -> "Population":
+        width = max((population.genes.shape[1] for population in populations), default=0)
+        population = cls(np.concatenate([np.pad(population.genes, ((0, 0), (0, width - population.genes.shape[1])))
+                                         for population in populations]))
+        for name in cls.columns:
+            setattr(population, name, np.concatenate([getattr(part, name) for part in populations]))
+        return population
+
+    def __len__(self):
+        return len(self.genes)
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        return self.genes[index, :self.lengths[index]]
+
+    def __setitem__(self, index: int, gene):
+        gene = np.asarray(gene, dtype=ACTION_DTYPE)
+        if len(gene) > self.genes.shape[1]:
+            self.genes = np.pad(self.genes, ((0, 0), (0, len(gene) - self.genes.shape[1])))
+        self.genes[index, :len(gene)] = gene
+        self.genes[index, len(gene):] = 0
+        self.lengths[index] = len(gene)
+        self.evaluated[index] = False
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def gene(self, index: int) -> Gene:
+        """
+        The gene at index with its fitness, as a view of the population.
+        """
+        return Gene(self.fitness[index], self[index])
+
+    def take(self, indices) -> "Population":
+        """
+        New population made of the genes at indices, with their evaluation, e.g. the selected parents or the elite.
+        """
+        population = Population(self.genes[indices])
+        for name in self.columns:
+            setattr(population, name, getattr(self, name)[indices])
+        return population
+
+    def replace(self, indices, genes):
+        """
+        Replace the genes at indices, e.g. the worst genes by migrants.
+        """
+        for index, gene in zip(indices, genes):
+            self[index] = gene
+
+    def matrix(self):
+        """
+        The action matrix and the lengths of the genes, as taken by the batched evaluator.
+        """
+        return self.genes, self.lengths
+
+    def set_result(self, result, rows=None):
+        """
+        Keep the evaluation of the genes at rows (all of them by default), which are up to date from now on.
+        """
+        rows = slice(None) if rows is None else rows
+        self.fitness[rows] = result.fitness
+        self.total_reward[rows] = result.total_reward
+        self.won[rows] = result.won
+        self.game_over[rows] = result.game_over
+        self.player_pos[rows] = result.player_pos
+        self.evaluated[rows] = True
+
+    def result(self) -> PopulationResult:
+        """
+        The last evaluation of every gene, as a PopulationResult.
+        """
+        return PopulationResult(self.total_reward.copy(), self.won.copy(), self.game_over.copy(),
+                                self.player_pos.copy(), fitness=self.fitness.copy())
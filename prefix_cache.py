@@ -0,0 +1,180 @@
+"""
+This module caches the game state reached after every prefix of the genes played on a deterministic lake.
+GeneticAlgorithmSolver builds every new gene by mutating the best gene and appending a few moves, so most genes
+share a long prefix with a gene that was already played. The batched evaluator looks up the longest cached prefix
+of each gene, starts it from the state stored for that prefix, and only simulates the rest of the gene.
+
+The cache is a trie flattened into arrays: every node is a prefix, identified by a 64-bit rolling hash of its moves,
+and the nodes are kept sorted by hash so a whole population is looked up with a few vectorized binary searches.
+Nodes only exist every block moves: the moves of a block are packed, 2 bits each, into one word that is hashed at once,
+which divides the hashing and the memory by block, at the cost of simulating less than a block more per gene.
+When it holds more than max_nodes prefixes, the least recently used ones are dropped. Using or inserting a prefix
+also uses every shorter prefix of it, so a prefix is never dropped while one of its extensions is kept.
+"""
+
+import numpy as np
+
+from actions import pack_actions
+
+# rolling hash of a prefix: sum of (word + 1) * HASH_BASE ** (blocks after it), modulo 2 ** 64
+HASH_BASE = np.uint64(0x9E3779B97F4A7C15)
+HASH_BASE_INVERSE = np.uint64(pow(int(HASH_BASE), -1, 1 << 64))
+# unsigned word holding the 2-bit actions of a block, by block size
+BLOCK_WORDS = {4: np.uint8, 8: np.uint16, 16: np.uint32, 32: np.uint64}
+
+
+def power_table(base: np.uint64, count: int) -> np.ndarray:
+    """
+    base ** 0 ... base ** (count - 1), modulo 2 ** 64.
+    """
+    powers = np.full(count, base, dtype=np.uint64)
+    powers[0] = 1
+    return np.multiply.accumulate(powers)
+
+
+def pack_blocks(actions, block: int) -> np.ndarray:
+    """
+    Pack every full block of moves of every row of the action matrix into one word.
+    """
+    population_size, gene_length = actions.shape
+    nodes = gene_length // block
+    # a block is a whole number of bytes, so packing the rows one after the other keeps every block in its word
+    packed = pack_actions(np.asarray(actions)[:, :nodes * block].ravel())
+    return packed.reshape(population_size, nodes * block // 4).view(BLOCK_WORDS[block])
+
+
+def prefix_hashes(actions, block: int) -> np.ndarray:
+    """
+    Hash of every block-aligned prefix of every row of the action matrix: column i holds the hash
+    of the first i * block moves, so column 0 is the empty prefix.
+    """
+    words = pack_blocks(actions, block)
+    population_size, nodes = words.shape
+    hashes = np.zeros((population_size, nodes + 1), dtype=np.uint64)
+    if nodes:
+        # hash_i = base ** i * sum_j (word_j + 1) * base ** -j, every operation wrapping modulo 2 ** 64
+        terms = (words.astype(np.uint64) + np.uint64(1)) * power_table(HASH_BASE_INVERSE, nodes + 1)[1:]
+        hashes[:, 1:] = np.cumsum(terms, axis=1, dtype=np.uint64) * power_table(HASH_BASE, nodes + 1)[1:]
+    return hashes
+
+
+class PrefixStateCache:
+    def __init__(self, max_nodes: int = 1_000_000, block: int = 8):
+        if block not in BLOCK_WORDS:
+            raise ValueError(f"block must be one of {sorted(BLOCK_WORDS)}, got {block}")
+        self.max_nodes: int = max_nodes
+        self.block: int = block
+        # moves reused from the cache and moves simulated
+        self.hits: int = 0
+        self.misses: int = 0
+        self.clear()
+
+    def clear(self):
+        self.key = None
+        # use counter, the nodes used least recently are evicted first
+        self.clock = 0
+        self.hashes = np.zeros(0, dtype=np.uint64)
+        self.stamps = np.zeros(0, dtype=np.int64)
+        # length of every prefix, in blocks
+        self.depths = np.zeros(0, dtype=np.int64)
+        self.states = np.zeros(0, dtype=np.int64)
+        self.rewards = np.zeros(0)
+        self.game_over = np.zeros(0, dtype=bool)
+        self.won = np.zeros(0, dtype=bool)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def cache_key(self, frozen_lake, stop_on_game_over: bool) -> bytes:
+        """
+        States only hold for the same board and the same game over rule.
+        """
+        return frozen_lake.board_fingerprint + bytes([stop_on_game_over])
+
+    def find(self, hashes):
+        """
+        Positions of the hashes in the cache, and whether they were found.
+        """
+        positions = np.searchsorted(self.hashes, hashes)
+        found = positions < len(self.hashes)
+        found[found] = self.hashes[positions[found]] == hashes[found]
+        return positions, found
+
+    def lookup(self, key: bytes, hashes, lengths):
+        """
+        Find the longest cached prefix of every gene, given the prefix hashes of the genes and their lengths.
+        Returns the prefix lengths, in moves, and the state after them: state, total reward, game over and won.
+        Every shorter prefix of a cached prefix is cached too, so the longest one is found by binary search.
+        The prefixes found, and all their shorter prefixes, are marked as used.
+        """
+        population_size = len(hashes)
+        rows = np.arange(population_size)
+        low = np.zeros(population_size, dtype=np.int64)
+        high = np.asarray(lengths, dtype=np.int64) // self.block if key == self.key and len(self) else low.copy()
+        while (low < high).any():
+            searching = low < high
+            middle = (low + high + 1) // 2
+            _, found = self.find(hashes[rows, middle])
+            found &= searching
+            low = np.where(found, middle, low)
+            high = np.where(searching & ~found, middle - 1, high)
+
+        state = np.zeros(population_size, dtype=np.int64)
+        total_reward = np.zeros(population_size)
+        game_over = np.zeros(population_size, dtype=bool)
+        won = np.zeros(population_size, dtype=bool)
+        used = np.arange(1, hashes.shape[1]) <= low[:, None]
+        if used.any():
+            positions, _ = self.find(hashes[:, 1:][used])
+            self.stamps[positions] = self.clock
+        cached = low > 0
+        positions, _ = self.find(hashes[rows[cached], low[cached]])
+        state[cached] = self.states[positions]
+        total_reward[cached] = self.rewards[positions]
+        game_over[cached] = self.game_over[positions]
+        won[cached] = self.won[positions]
+        prefix = low * self.block
+        self.hits += int(prefix.sum())
+        return prefix, state, total_reward, game_over, won
+
+    def insert(self, key: bytes, hashes, depths, state, total_reward, game_over, won):
+        """
+        Store the state reached after every given prefix hash, of depths blocks, dropping the least recently used
+        prefixes if the cache is full. The shorter prefixes of the given ones must be cached, or given too.
+        """
+        if key != self.key:
+            self.clear()
+            self.key = key
+        hashes, first = np.unique(hashes, return_index=True)
+        positions, known = self.find(hashes)
+        self.stamps[positions[known]] = self.clock
+        new = first[~known]
+        hashes = hashes[~known]
+        positions = np.searchsorted(self.hashes, hashes)
+        self.hashes = np.insert(self.hashes, positions, hashes)
+        self.stamps = np.insert(self.stamps, positions, self.clock)
+        self.depths = np.insert(self.depths, positions, depths[new])
+        self.states = np.insert(self.states, positions, state[new])
+        self.rewards = np.insert(self.rewards, positions, total_reward[new])
+        self.game_over = np.insert(self.game_over, positions, game_over[new])
+        self.won = np.insert(self.won, positions, won[new])
+        self.clock += 1
+        if len(self) > self.max_nodes:
+            self.evict()
+
+    def evict(self):
+        """
+        Keep the max_nodes most recently used prefixes. A prefix is used at least as recently as its extensions,
+        so the shorter prefixes of every kept prefix are kept too.
+        Among prefixes used together, the longest ones are dropped first.
+        """
+        kept = np.zeros(len(self), dtype=bool)
+        kept[np.lexsort((self.depths, -self.stamps))[:self.max_nodes]] = True
+        for name in ('hashes', 'stamps', 'depths', 'states', 'rewards', 'game_over', 'won'):
+            setattr(self, name, getattr(self, name)[kept])
+
+    def stats(self) -> dict:
+        return {'nodes': len(self), 'max_nodes': self.max_nodes, 'hits': self.hits, 'misses': self.misses}
+
+    def __str__(self):
+        return f"prefix cache: {len(self)}/{self.max_nodes} prefixes, moves reused: {self.hits}, moves simulated: {self.misses}"
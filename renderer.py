@@ -0,0 +1,68 @@
+"""
+This module renders a frozen lake game with pygame.
+It is only imported when a game is rendered, so headless runs never load pygame or the images.
+The static board (floor, holes and goal) is drawn once into a background surface, and every
+frame only redraws the cells the player left and entered.
+"""
+
+import os
+
+import numpy as np
+import pygame
+
+from images.load_images import load_image
+
+IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
+
+
+class FrozenLakeRenderer:
+    def __init__(self, frozen_lake, window_size: int = 500):
+        self.frozen_lake = frozen_lake
+        # the cells shrink with the board, so the whole lake always fits in the window
+        self.block_size = max(1, window_size // frozen_lake.size)
+        side = self.block_size * frozen_lake.size
+        pygame.init()
+        self.screen = pygame.display.set_mode((side, side))
+        self.colors = {'black': (0, 0, 0), 'white': (255, 255, 255), 'red': (255, 0, 0), 'green': (0, 255, 0), 'blue': (0, 0, 255)}
+        size = (self.block_size, self.block_size)
+        self.player_image = load_image(os.path.join(IMAGES_DIR, "student.png"), size=size)
+        self.goal_image = load_image(os.path.join(IMAGES_DIR, "nova.png"), size=size)
+        self.hole_image = load_image(os.path.join(IMAGES_DIR, "cat.png"), size=size)
+        self.background = None
+        self.board_fingerprint = None
+        self.drawn_pos = None
+
+    def cell_rect(self, pos):
+        return pygame.Rect(pos[1] * self.block_size, pos[0] * self.block_size, self.block_size, self.block_size)
+
+    def draw_background(self):
+        """
+        Draw the floor, the holes and the goal into the cached background surface
+        """
+        frozen_lake = self.frozen_lake
+        self.background = pygame.Surface(self.screen.get_size())
+        self.background.fill(self.colors['white'])
+        for hole in np.argwhere(frozen_lake.holes):
+            self.background.blit(self.hole_image, self.cell_rect(hole))
+        self.background.blit(self.goal_image, self.cell_rect(frozen_lake.goal_pos))
+        self.board_fingerprint = frozen_lake.board_fingerprint
+
+    def render(self):
+        """
+        This method renders the game visuals.
+        The first frame, and any frame after the board changed, redraws the whole window;
+        the other frames only update the previous and the current player cells.
+        """
+        player_pos = tuple(self.frozen_lake.player_pos)
+        if self.background is None or self.board_fingerprint != self.frozen_lake.board_fingerprint:
+            self.draw_background()
+            self.screen.blit(self.background, (0, 0))
+            self.screen.blit(self.player_image, self.cell_rect(player_pos))
+            pygame.display.flip()
+        elif player_pos != self.drawn_pos:
+            old_rect = self.cell_rect(self.drawn_pos)
+            new_rect = self.cell_rect(player_pos)
+            self.screen.blit(self.background, old_rect, area=old_rect)
+            self.screen.blit(self.player_image, new_rect)
+            pygame.display.update([old_rect, new_rect])
+        self.drawn_pos = player_pos
@@ -0,0 +1,84 @@
+"""
+This module holds the parent selection methods of the GAs, vectorized over the whole population:
+each one takes the fitness of every gene and draws the indices of all the parents of a generation in one call.
+- fps_selection: fitness proportionate selection (roulette wheel),
+- sus_selection: stochastic universal sampling, a roulette wheel spun once with evenly spaced pointers,
+- rank_selection: linear ranking, probabilities given by the rank of the genes instead of their fitness,
+- tournament_selection: the best of k genes drawn at random, for every parent.
+"""
+
+import numpy as np
+
+
+def fps_probabilities(fitness) -> np.ndarray:
+    """
+    Probability of every gene to be selected, proportional to its fitness.
+    Negative fitness counts as zero, and if no gene has a positive fitness they are all equally likely.
+    """
+    fitness = np.maximum(np.asarray(fitness, dtype=float), 0)
+    total_fitness = fitness.sum()
+    if total_fitness == 0:
+        return np.full(len(fitness), 1 / len(fitness))
+    return fitness / total_fitness
+
+
+def fps_selection(rng, fitness, count: int) -> np.ndarray:
+    """
+    Draw count parents, independently, with probability proportional to their fitness.
+    """
+    return rng.choice(len(fitness), size=count, p=fps_probabilities(fitness))
+
+
+def sus_selection(rng, fitness, count: int) -> np.ndarray:
+    """
+    Draw count parents with a single spin of a wheel of count evenly spaced pointers.
+    Every gene is selected either floor or ceil of its expected number of times, so there is less
+    sampling noise than with fps_selection. The parents are returned in random order.
+    """
+    cumulative = np.cumsum(fps_probabilities(fitness))
+    pointers = (rng.random() + np.arange(count)) / count
+    indices = np.minimum(np.searchsorted(cumulative, pointers * cumulative[-1], side='right'), len(cumulative) - 1)
+    return rng.permutation(indices)
+
+
+def rank_selection(rng, fitness, count: int, pressure: float = 1.5) -> np.ndarray:
+    """
+    Draw count parents with linear ranking: the worst gene has probability (2 - pressure) / n and the best
+    pressure / n, whatever their fitness. pressure goes from 1 (uniform) to 2.
+    """
+    population_size = len(fitness)
+    if population_size == 1:
+        return np.zeros(count, dtype=np.int64)
+    ranks = np.empty(population_size)
+    ranks[np.argsort(fitness, kind="stable")] = np.arange(population_size)
+    probabilities = (2 - pressure + 2 * (pressure - 1) * ranks / (population_size - 1)) / population_size
+    return rng.choice(population_size, size=count, p=probabilities / probabilities.sum())
+
+
+def tournament_contestants(rng, population_size: int, count: int, size: int) -> np.ndarray:
+    """
+    (count, size) matrix of distinct genes for every tournament.
+    Column j is drawn among the population_size - j genes left and shifted past the genes already drawn in its row.
+    """
+    size = min(size, population_size)
+    contestants = np.empty((count, size), dtype=np.int64)
+    for column in range(size):
+        drawn = rng.integers(0, population_size - column, size=count)
+        for previous in np.sort(contestants[:, :column], axis=1).T:
+            drawn += drawn >= previous
+        contestants[:, column] = drawn
+    return contestants
+
+
+def tournament_selection(rng, fitness, count: int, size: int = 2) -> np.ndarray:
+    """
+    Draw count parents, each one the fittest of size distinct genes drawn at random.
+    A larger size gives a stronger selection pressure.
+    """
+    contestants = tournament_contestants(rng, len(fitness), count, size)
+    winners = np.argmax(np.asarray(fitness)[contestants], axis=1)
+    return contestants[np.arange(count), winners]
+
+
+SELECTION_METHODS = {'fps': fps_selection, 'sus': sus_selection, 'rank': rank_selection,
+                     'tournament': tournament_selection}
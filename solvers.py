@@ -0,0 +1,10 @@
+"""
+This module names the GA solvers, so command lines and configurations can pick one by name.
+"""
+
+from genetic_solver import GeneticAlgorithmSolver
+from genetic_algorithm_fps import GeneticAlgorithmSolverFPS
+from genetic_algorithm_tournament import GeneticAlgorithmSolverTournament
+
+SOLVERS = {'elitist': GeneticAlgorithmSolver, 'fps': GeneticAlgorithmSolverFPS,
+           'tournament': GeneticAlgorithmSolverTournament}
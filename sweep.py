@@ -0,0 +1,256 @@
+"""
+In this module we sweep the hyperparameters of the GAs: solver, population size, gene length, mutation method,
+elite fraction and slippery mode. Every configuration of a grid, or a random sample of it, is solved on `trials` lakes,
+and every (configuration, trial) cell runs on a pool of worker processes.
+
+Not every axis applies to every solver: the mutation method is read by the elitist and FPS solvers only (the tournament
+solver always mutates one action), and the elite fraction by the tournament solver only. The axes a solver ignores are
+set to None in its configurations, so they are not swept for it, and are shown as '-' in the summary.
+
+Results are appended to a columnar store: a directory of .npz parts, each one holding a column per field for a batch
+of finished cells, written atomically. When the sweep is restarted on the same store, the cells already in it are skipped,
+so a killed sweep resumes where it stopped. Trial i plays the same lake for every configuration, which makes configurations
+directly comparable.
+
+    python sweep.py sweep_results --population-sizes 10 50 --gene-lengths 8 16 --trials 20
+    python sweep.py sweep_results --search random --samples 30 --trials 20
+    python sweep.py sweep_results --summary
+"""
+
+import argparse
+import glob
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from tqdm import tqdm
+
+from frozen_lake_raw import FrozenLakeRaw
+from solvers import SOLVERS
+
+# the parameters of a configuration, and the values swept by default
+SEARCH_SPACE = {
+    'solver': ['elitist', 'fps', 'tournament'],
+    'population_size': [10, 50],
+    'gene_length': [3, 8, 10],
+    'mutation_method': [None, 'swap', 'scramble'],
+    'elite_size': [0.2],
+    'slippery': [False],
+}
+
+# the axes of the search space that only some solvers read, and the solvers that read them
+SOLVER_AXES = {
+    'mutation_method': ('elitist', 'fps'),
+    'elite_size': ('tournament',),
+}
+
+# columns of the store, with their dtype. mutation_method None is stored as '', elite_size None as nan
+COLUMNS = {
+    'key': str, 'solver': str, 'population_size': np.int64, 'gene_length': np.int64, 'mutation_method': str,
+    'elite_size': float, 'slippery': bool, 'trial': np.int64, 'seed': np.int64, 'max_generations': np.int64,
+    'generations': np.int64, 'won': bool, 'seconds': float, 'evaluations': np.int64,
+}
+
+
+def grid_configs(space: dict) -> list:
+    """
+    Every combination of the values of the search space, with the axes its solver ignores set to None.
+    """
+    names = list(space)
+    configs, seen = [], set()
+    for values in itertools.product(*(space[name] for name in names)):
+        config = dict(zip(names, values))
+        for name, solvers in SOLVER_AXES.items():
+            if name in config and config['solver'] not in solvers:
+                config[name] = None
+        key = json.dumps(config, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            configs.append(config)
+    return configs
+
+
+def random_configs(space: dict, samples: int, seed=None) -> list:
+    """
+    samples distinct combinations drawn at random from the grid of the search space.
+    """
+    configs = grid_configs(space)
+    rng = np.random.default_rng(seed)
+    return [configs[index] for index in rng.choice(len(configs), size=min(samples, len(configs)), replace=False)]
+
+
+def cell_key(config: dict, trial: int, seed: int, max_generations: int) -> str:
+    """
+    Identifies a cell in the store, so finished cells are recognized on restart.
+    """
+    return json.dumps({**config, 'trial': trial, 'seed': seed, 'max_generations': max_generations}, sort_keys=True)
+
+
+def run_cell(task) -> dict:
+    """
+    Solve the lake of one trial with one configuration. Returns the row of the cell.
+    """
+    config, trial, seed, max_generations = task
+    # the lake only depends on the trial, the solver generator on the trial too, so configurations share both
+    game_seed, solver_seed = np.random.SeedSequence(seed, spawn_key=(trial,)).spawn(2)
+    frozen_lake = FrozenLakeRaw(slippery=config['slippery'], rng=np.random.default_rng(game_seed))
+    solver = SOLVERS[config['solver']](frozen_lake, config['population_size'], config['gene_length'],
+                                       config['mutation_method'], rng=np.random.default_rng(solver_seed))
+    if config['elite_size'] is not None:
+        solver.elite_size = config['elite_size']
+    solver.max_generations = max_generations
+    start = time.perf_counter()
+    solver.solve()
+    seconds = time.perf_counter() - start
+    return {**config, 'key': cell_key(config, trial, seed, max_generations), 'trial': trial, 'seed': seed,
+            'max_generations': max_generations, 'mutation_method': config['mutation_method'] or '',
+            'elite_size': np.nan if config['elite_size'] is None else config['elite_size'],
+            # a run that gives up ends at max_generations + 1
+            'generations': solver.stats.generation, 'won': solver.stats.generation <= max_generations,
+            'seconds': seconds, 'evaluations': solver.evaluations}
+
+
+class SweepStore:
+    """
+    Append-only columnar store of finished cells, kept in a directory of .npz parts.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def parts(self) -> list:
+        return sorted(glob.glob(os.path.join(self.path, "part-*.npz")))
+
+    def append(self, rows: list):
+        """
+        Write rows as a new part, atomically, so an interrupted sweep never leaves a partial part.
+        """
+        if not rows:
+            return
+        columns = {name: np.array([row[name] for row in rows], dtype=dtype) for name, dtype in COLUMNS.items()}
+        parts = self.parts()
+        number = int(os.path.basename(parts[-1])[5:-4]) + 1 if parts else 0
+        path = os.path.join(self.path, f"part-{number:06d}.npz")
+        with open(path + ".tmp", "wb") as file:
+            np.savez(file, **columns)
+        os.replace(path + ".tmp", path)
+
+    def read(self, columns=None) -> dict:
+        """
+        The given columns of every stored cell, all of them by default.
+        """
+        columns = list(COLUMNS) if columns is None else columns
+        chunks = {name: [] for name in columns}
+        for part in self.parts():
+            with np.load(part, allow_pickle=False) as arrays:
+                for name in columns:
+                    chunks[name].append(arrays[name])
+        return {name: np.concatenate(chunk) if chunk else np.array([], dtype=COLUMNS[name])
+                for name, chunk in chunks.items()}
+
+    def finished_keys(self) -> set:
+        return set(self.read(['key'])['key'].tolist())
+
+
+def run_sweep(store: SweepStore, configs: list, trials: int, seed: int = 0, max_generations: int = 100,
+              workers: int = None, flush_every: int = 64) -> int:
+    """
+    Run every (configuration, trial) cell missing from the store over workers processes (all the cores by default),
+    appending the finished cells to the store every flush_every cells. Returns the number of cells run.
+    """
+    finished = store.finished_keys()
+    tasks = [(config, trial, seed, max_generations) for config in configs for trial in range(trials)
+             if cell_key(config, trial, seed, max_generations) not in finished]
+    if not tasks:
+        return 0
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        futures = [executor.submit(run_cell, task) for task in tasks]
+        try:
+            for future in tqdm(as_completed(futures), total=len(futures)):
+                rows.append(future.result())
+                if len(rows) >= flush_every:
+                    store.append(rows)
+                    rows = []
+        finally:
+            # keep what was finished, even if the sweep is interrupted
+            store.append(rows)
+            for future in futures:
+                future.cancel()
+    return len(tasks)
+
+
+def summarize(store: SweepStore) -> list:
+    """
+    Summary of every configuration of the store: runs, fraction solved, mean and median generations
+    (a failed run counts max_generations + 1, as in the solver stats), mean generations of the solved runs,
+    and mean and total wall time.
+    Sorted from the fewest generations to the most.
+    """
+    data = store.read()
+    names = list(SEARCH_SPACE) + ['max_generations']
+    configs = [json.dumps({name: data[name][row].item() for name in names}) for row in range(len(data['key']))]
+    unique, inverse = np.unique(configs, return_inverse=True)
+    summary = []
+    for index, config in enumerate(unique):
+        rows = inverse == index
+        generations = data['generations'][rows]
+        solved = data['won'][rows]
+        summary.append({**json.loads(config),
+                        'runs': int(rows.sum()),
+                        'solved': float(solved.mean()),
+                        'mean_generations': float(generations.mean()),
+                        'median_generations': float(np.median(generations)),
+                        'mean_generations_to_solve': float(generations[solved].mean()) if solved.any() else None,
+                        'mean_seconds': float(data['seconds'][rows].mean()),
+                        'total_seconds': float(data['seconds'][rows].sum())})
+    return sorted(summary, key=lambda row: (row['mean_generations'], row['mean_seconds']))
+
+
+def print_summary(summary: list):
+    header = f"{'solver':<11}{'pop':>6}{'genes':>7}{'mutation':>10}{'elite':>7}{'slip':>6}" \
+             f"{'runs':>6}{'solved':>8}{'mean gen':>10}{'median':>8}{'to solve':>10}{'mean s':>9}"
+    print(header)
+    for row in summary:
+        to_solve = '-' if row['mean_generations_to_solve'] is None else f"{row['mean_generations_to_solve']:.2f}"
+        elite = '-' if np.isnan(row['elite_size']) else f"{row['elite_size']:.2f}"
+        print(f"{row['solver']:<11}{row['population_size']:>6}{row['gene_length']:>7}{row['mutation_method'] or '-':>10}"
+              f"{elite:>7}{str(row['slippery']):>6}{row['runs']:>6}{row['solved']:>8.2f}"
+              f"{row['mean_generations']:>10.2f}{row['median_generations']:>8.1f}{to_solve:>10}{row['mean_seconds']:>9.4f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep the hyperparameters of the GAs, resuming finished cells")
+    parser.add_argument("store", help="directory of the results, created if needed")
+    parser.add_argument("--search", choices=["grid", "random"], default="grid")
+    parser.add_argument("--samples", type=int, default=20, help="configurations drawn by a random search")
+    parser.add_argument("--solvers", nargs="+", choices=sorted(SOLVERS), default=SEARCH_SPACE['solver'])
+    parser.add_argument("--population-sizes", type=int, nargs="+", default=SEARCH_SPACE['population_size'])
+    parser.add_argument("--gene-lengths", type=int, nargs="+", default=SEARCH_SPACE['gene_length'])
+    parser.add_argument("--mutation-methods", nargs="+", choices=["none", "swap", "scramble"], default=["none", "swap", "scramble"])
+    parser.add_argument("--elite-sizes", type=float, nargs="+", default=SEARCH_SPACE['elite_size'])
+    parser.add_argument("--slippery", choices=["no", "yes", "both"], default="no")
+    parser.add_argument("--trials", type=int, default=10, help="lakes solved per configuration")
+    parser.add_argument("--max-generations", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, all the cores by default")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the lakes, the solvers and the random search")
+    parser.add_argument("--summary", action="store_true", help="only print the summary of the store")
+    args = parser.parse_args()
+
+    store = SweepStore(args.store)
+    if not args.summary:
+        space = {
+            'solver': args.solvers,
+            'population_size': args.population_sizes,
+            'gene_length': args.gene_lengths,
+            'mutation_method': [None if method == "none" else method for method in args.mutation_methods],
+            'elite_size': args.elite_sizes,
+            'slippery': {"no": [False], "yes": [True], "both": [False, True]}[args.slippery],
+        }
+        configs = grid_configs(space) if args.search == "grid" else random_configs(space, args.samples, args.seed)
+        cells = run_sweep(store, configs, args.trials, args.seed, args.max_generations, args.workers)
+        print(f"{cells} cells run, {len(configs) * args.trials - cells} already in {args.store}")
+    print_summary(summarize(store))
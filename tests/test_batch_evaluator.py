@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from batch_evaluator import evaluate_boards, evaluate_population
+from frozen_lake_raw import FrozenLakeRaw
+from genetic_algorithm_fps import GeneticAlgorithmSolverFPS
+from genetic_algorithm_tournament import GeneticAlgorithmSolverTournament
+from genetic_solver import GeneticAlgorithmSolver
+
+
+@pytest.mark.parametrize("solver_class", [GeneticAlgorithmSolver, GeneticAlgorithmSolverFPS,
+                                          GeneticAlgorithmSolverTournament])
+def test_batched_fitness_matches_playing_every_gene(solver_class):
+    rng = np.random.default_rng(0)
+    for trial in range(30):
+        lake = FrozenLakeRaw(size=int(rng.integers(1, 7)), rng=trial)
+        solver = solver_class(lake, 20, 8, None, rng=trial)
+        genes = [rng.integers(0, 4, int(rng.integers(0, 16))).astype(np.uint8) for _ in range(20)]
+        result = solver.evaluate_population(genes)
+        for index, gene in enumerate(genes):
+            lake.restart()
+            fitness = solver.calculate_gene_fitness(gene)
+            assert fitness == pytest.approx(result.fitness[index])
+            assert lake.total_reward == pytest.approx(result.total_reward[index])
+            assert (lake.won, lake.game_over) == (result.won[index], result.game_over[index])
+            if not lake.game_over or not solver.stop_on_game_over:
+                assert tuple(lake.player_pos) == tuple(result.player_pos[index])
+        lake.restart()
+
+
+@pytest.mark.parametrize("stop_on_game_over", [True, False])
+def test_batched_games_match_take_action(stop_on_game_over):
+    rng = np.random.default_rng(1)
+    for trial in range(30):
+        lake = FrozenLakeRaw(size=int(rng.integers(2, 7)), rng=trial)
+        actions = rng.integers(0, 4, (12, 20)).astype(np.uint8)
+        lengths = rng.integers(0, 21, 12)
+        result = evaluate_population(lake, actions, lengths, stop_on_game_over)
+        for row, length in enumerate(lengths):
+            lake.restart()
+            for action in actions[row, :length]:
+                lake.take_action(action)
+                if stop_on_game_over and lake.game_over:
+                    break
+            assert lake.total_reward == pytest.approx(result.total_reward[row])
+            assert (lake.won, lake.game_over) == (result.won[row], result.game_over[row])
+            assert tuple(lake.player_pos) == tuple(result.player_pos[row])
+        lake.restart()
+
+
+@pytest.mark.parametrize("stop_on_game_over", [True, False])
+def test_every_board_plays_as_if_alone(stop_on_game_over):
+    rng = np.random.default_rng(2)
+    lakes = [FrozenLakeRaw(size=size, rng=seed) for seed, size in enumerate([3, 5, 4, 6])]
+    actions = rng.integers(0, 4, (10, 15)).astype(np.uint8)
+    lengths = rng.integers(0, 16, 10)
+    result = evaluate_boards(lakes + lakes[:1], actions, lengths, stop_on_game_over)
+    for board, lake in enumerate(lakes + lakes[:1]):
+        alone = evaluate_population(lake, actions, lengths, stop_on_game_over)
+        entries = slice(board, None, len(lakes) + 1)
+        assert np.array_equal(result.total_reward[entries], alone.total_reward)
+        assert np.array_equal(result.won[entries], alone.won)
+        assert np.array_equal(result.game_over[entries], alone.game_over)
+        assert np.array_equal(result.player_pos[entries], alone.player_pos)
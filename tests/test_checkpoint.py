@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from checkpoint import load_checkpoint, pack_genes, save_checkpoint, solve_with_checkpoints, unpack_genes
+from frozen_lake_raw import FrozenLakeRaw
+from genetic_algorithm_fps import GeneticAlgorithmSolverFPS
+from genetic_algorithm_tournament import GeneticAlgorithmSolverTournament
+from genetic_solver import GeneticAlgorithmSolver
+from monte_carlo import MonteCarloFitness
+
+SOLVERS = [(GeneticAlgorithmSolver, 3), (GeneticAlgorithmSolverFPS, 10), (GeneticAlgorithmSolverTournament, 10)]
+
+
+def records(generations):
+    return [(record.generation, record.best_fitness, record.best_gene.tolist(), record.evaluations, record.won)
+            for record in generations]
+
+
+def make_solver(solver_class, gene_length, seed, slippery, **kwargs):
+    return solver_class(FrozenLakeRaw(size=6, slippery=slippery, rng=seed), 10, gene_length, None, rng=seed, **kwargs)
+
+
+def test_packed_genes_round_trip():
+    rng = np.random.default_rng(0)
+    genes = [rng.integers(0, 4, length).astype(np.uint8) for length in rng.integers(0, 50, 200)]
+    unpacked = unpack_genes(*pack_genes(genes))
+    assert len(unpacked) == len(genes)
+    assert all(np.array_equal(gene, again) for gene, again in zip(genes, unpacked))
+
+
+@pytest.mark.parametrize("slippery", [False, True])
+@pytest.mark.parametrize("solver_class, gene_length", SOLVERS)
+def test_resumed_runs_match_uninterrupted_runs(tmp_path, solver_class, gene_length, slippery):
+    resumed = 0
+    for seed in range(6):
+        kwargs = {'monte_carlo': MonteCarloFitness()} if slippery and seed % 2 else {}
+        full = records(make_solver(solver_class, gene_length, seed, slippery, **kwargs).iter_generations())
+        path = str(tmp_path / f"{seed}.npz")
+        interrupted = []
+        for record in solve_with_checkpoints(make_solver(solver_class, gene_length, seed, slippery, **kwargs),
+                                             path, every=3):
+            interrupted.append(record)
+            if record.generation == 7:
+                break
+        if len(full) <= 6 or interrupted[-1].won:
+            continue
+        # the last checkpoint was written after generation 6, both ways of resuming replay the rest exactly
+        assert records(load_checkpoint(path).iter_generations(resume=True)) == full[6:]
+        solver = make_solver(solver_class, gene_length, seed, slippery, **kwargs)
+        assert records(solve_with_checkpoints(solver, path, every=3)) == full[6:]
+        resumed += 1
+    assert resumed
+
+
+@pytest.mark.parametrize("solver_class, gene_length", [(GeneticAlgorithmSolver, 3), (GeneticAlgorithmSolverFPS, 16),
+                                                       (GeneticAlgorithmSolverTournament, 16)])
+def test_won_runs_are_not_evolved_again(tmp_path, solver_class, gene_length):
+    path = str(tmp_path / "won.npz")
+    for seed in range(10):
+        last = records(solve_with_checkpoints(make_solver(solver_class, gene_length, seed, False), path, every=1000))[-1]
+        if last[-1]:
+            break
+    assert last[-1]
+    solver = make_solver(solver_class, gene_length, seed, False)
+    assert records(solve_with_checkpoints(solver, path, every=1000)) == []
+    assert solver.stats.generation == last[0]
+    assert solver.best_gene.tolist() == last[2]
+
+
+def test_checkpoints_refuse_other_fitness_settings(tmp_path):
+    path = str(tmp_path / "slippery.npz")
+    save_checkpoint(make_solver(GeneticAlgorithmSolverFPS, 10, 0, True, monte_carlo=MonteCarloFitness()), path)
+    assert load_checkpoint(path).monte_carlo is not None
+    with pytest.raises(ValueError):
+        records(solve_with_checkpoints(make_solver(GeneticAlgorithmSolverFPS, 10, 0, True), path))
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from frozen_lake_raw import FrozenLakeRaw
+from genetic_algorithm_fps import GeneticAlgorithmSolverFPS
+from genetic_algorithm_tournament import GeneticAlgorithmSolverTournament
+from genetic_solver import GeneticAlgorithmSolver
+
+
+@pytest.mark.parametrize("solver_class, gene_length", [(GeneticAlgorithmSolver, 3), (GeneticAlgorithmSolverFPS, 8),
+                                                       (GeneticAlgorithmSolverTournament, 8)])
+def test_cached_solves_match_uncached_solves(solver_class, gene_length):
+    for seed in range(10):
+        uncached = solver_class(FrozenLakeRaw(rng=seed), 10, gene_length, None, rng=seed)
+        uncached.solve()
+        # a tiny cache keeps evicting, which must not change the results either
+        for fitness_cache_size in (4, 10_000):
+            cached = solver_class(FrozenLakeRaw(rng=seed), 10, gene_length, None, rng=seed,
+                                  fitness_cache_size=fitness_cache_size)
+            cached.solve()
+            assert cached.stats.generation == uncached.stats.generation
+            assert np.array_equal(cached.stats.best_gene, uncached.stats.best_gene)
+
+
+def test_cached_gene_restores_the_game():
+    lake = FrozenLakeRaw(size=5, rng=0)
+    solver = GeneticAlgorithmSolverFPS(lake, 10, 8, None, rng=0, fitness_cache_size=100)
+    gene = np.random.default_rng(0).integers(0, 4, 12).astype(np.uint8)
+    played = solver.calculate_gene_fitness(gene), lake.total_reward, lake.won, lake.game_over, tuple(lake.player_pos)
+    lake.restart()
+    cached = solver.calculate_gene_fitness(gene), lake.total_reward, lake.won, lake.game_over, tuple(lake.player_pos)
+    assert cached == played
+    assert solver.fitness_cache.hits == 1
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from actions import DOWN, RIGHT
+from frozen_lake_raw import FrozenLakeRaw
+
+
+def test_setting_hole_positions_rebuilds_the_board():
+    lake = FrozenLakeRaw(size=4, holes=np.zeros((4, 4), dtype=bool))
+    fingerprint = lake.board_fingerprint
+    lake.hole_positions = [(0, 1)]
+
+    assert lake.hole_positions == [(0, 1)]
+    assert lake.board_fingerprint != fingerprint
+    lake.take_action(RIGHT)
+    assert lake.game_over and not lake.won
+    assert lake.total_reward == lake.rewards['hole']
+
+
+def test_stepping_around_a_new_hole():
+    lake = FrozenLakeRaw(size=4, holes=np.zeros((4, 4), dtype=bool))
+    lake.hole_positions = [(0, 1)]
+    lake.take_action(DOWN)
+    assert not lake.game_over
+    assert lake.player_pos == (1, 0)
+
+
+def rule_step(lake, position, game_over, action):
+    # the rules take_action followed before the transition tables, on a deterministic lake
+    if game_over:
+        position = (0, 0)
+    row, col = position[0] + lake.ACTIONS[action][0], position[1] + lake.ACTIONS[action][1]
+    if not (0 <= row < lake.size and 0 <= col < lake.size):
+        return position, lake.rewards['out-of-bounds'], False, False
+    if (row, col) == lake.goal_pos and not game_over:
+        return position, lake.rewards['goal'], True, True
+    if (row, col) in lake.hole_positions:
+        return position, lake.rewards['hole'], True, False
+    return (row, col), lake.rewards['move'], False, False
+
+
+def test_transition_tables_follow_the_rules():
+    rng = np.random.default_rng(0)
+    for trial in range(50):
+        lake = FrozenLakeRaw(size=int(rng.integers(1, 8)), rng=trial)
+        position, total_reward, game_over, won = (0, 0), 0, False, False
+        for action in rng.integers(0, 4, 60):
+            position, reward, ended, reached = rule_step(lake, position, game_over, action)
+            total_reward += reward
+            game_over |= ended
+            won |= reached
+            lake.take_action(action)
+            assert tuple(lake.player_pos) == position
+            assert lake.total_reward == pytest.approx(total_reward)
+            assert (lake.game_over, lake.won) == (game_over, won)
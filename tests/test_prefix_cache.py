@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from batch_evaluator import evaluate_population
+from frozen_lake_raw import FrozenLakeRaw
+from genetic_algorithm_fps import GeneticAlgorithmSolverFPS
+from genetic_algorithm_tournament import GeneticAlgorithmSolverTournament
+from genetic_solver import GeneticAlgorithmSolver
+from prefix_cache import PrefixStateCache, prefix_hashes
+
+
+@pytest.mark.parametrize("stop_on_game_over", [True, False])
+@pytest.mark.parametrize("max_nodes", [1, 20, 1_000_000])
+def test_cached_prefixes_match_uncached_evaluations(stop_on_game_over, max_nodes):
+    rng = np.random.default_rng(0)
+    for trial in range(20):
+        lake = FrozenLakeRaw(size=int(rng.integers(2, 7)), rng=trial)
+        cache = PrefixStateCache(max_nodes, block=4)
+        base = rng.integers(0, 4, 30).astype(np.uint8)
+        for generation in range(6):
+            # genes grown and mutated from one another, as GeneticAlgorithmSolver builds them
+            population_size, gene_length = int(rng.integers(1, 12)), len(base)
+            actions = np.tile(base, (population_size, 1))
+            mutated = rng.random(population_size) < 0.5
+            actions[mutated, rng.integers(0, gene_length, mutated.sum())] = rng.integers(0, 4, mutated.sum())
+            lengths = rng.integers(0, gene_length + 1, population_size)
+            uncached = evaluate_population(lake, actions, lengths, stop_on_game_over)
+            cached = evaluate_population(lake, actions, lengths, stop_on_game_over, cache)
+            assert np.array_equal(cached.total_reward, uncached.total_reward)
+            assert np.array_equal(cached.won, uncached.won)
+            assert np.array_equal(cached.game_over, uncached.game_over)
+            assert np.array_equal(cached.player_pos, uncached.player_pos)
+            assert len(cache) <= max_nodes
+            base = np.concatenate([base, rng.integers(0, 4, 3).astype(np.uint8)])
+    if max_nodes > 1:
+        assert cache.hits
+
+
+def test_evicting_keeps_the_shorter_prefixes_of_kept_ones():
+    rng = np.random.default_rng(1)
+    lake = FrozenLakeRaw(size=12, holes=np.zeros((12, 12), dtype=bool))
+    cache = PrefixStateCache(20, block=4)
+    base = rng.integers(0, 4, 200).astype(np.uint8)
+    for generation in range(30):
+        gene_length = int(rng.integers(4, 120))
+        actions = np.tile(base[:gene_length], (8, 1))
+        actions[np.arange(8), rng.integers(0, gene_length, 8)] = rng.integers(0, 4, 8)
+        evaluate_population(lake, actions, stop_on_game_over=False, prefix_cache=cache)
+        assert len(cache) <= cache.max_nodes
+        # the prefixes of a gene held by the cache are its shortest ones, without gaps
+        _, found = cache.find(prefix_hashes(actions, cache.block)[:, 1:].ravel())
+        found = found.reshape(len(actions), -1)
+        assert not (np.diff(found.astype(np.int8), axis=1) > 0).any()
+        base = np.concatenate([base[:gene_length], rng.integers(0, 4, 3).astype(np.uint8), base[gene_length:]])[:200]
+
+
+@pytest.mark.parametrize("solver_class, gene_length", [(GeneticAlgorithmSolver, 3), (GeneticAlgorithmSolverFPS, 8),
+                                                       (GeneticAlgorithmSolverTournament, 8)])
+def test_cached_solves_match_uncached_solves(solver_class, gene_length):
+    for seed in range(10):
+        uncached = solver_class(FrozenLakeRaw(rng=seed), 10, gene_length, None, rng=seed)
+        uncached.solve()
+        cached = solver_class(FrozenLakeRaw(rng=seed), 10, gene_length, None, rng=seed, prefix_cache_size=100_000)
+        cached.solve()
+        assert cached.stats.generation == uncached.stats.generation
+        assert np.array_equal(cached.stats.best_gene, uncached.stats.best_gene)
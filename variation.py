@@ -0,0 +1,113 @@
+"""
+This module holds the crossover and mutation operators of the GAs, vectorized over a whole population.
+Crossovers take two arrays of parent indices and build the whole offspring matrix from the rows of the parents,
+mutations draw their random indices for every row at once and change the population in place.
+Mutation rates are the probability of every gene to be mutated, either one number or one per gene.
+
+As in GeneticAlgorithm.crossover and GeneticAlgorithm.mutate, the random positions are drawn up to
+the gene length of the solver (high), and a mutation at a position past the end of a gene does nothing.
+"""
+
+import numpy as np
+
+from population import Population
+
+
+def mutated_rows(rng, count: int, rate) -> np.ndarray:
+    """
+    Rows picked for a mutation, each with its own probability if rate is an array.
+    """
+    rate = np.broadcast_to(np.asarray(rate, dtype=float), count)
+    if (rate >= 1).all():
+        return np.arange(count)
+    return np.flatnonzero(rng.random(count) < rate)
+
+
+def one_point_crossover(rng, population: Population, parents1, parents2, high: int) -> Population:
+    """
+    Child i is the start of gene parents1[i] up to a random point in [1, high - 1), followed by the
+    rest of gene parents2[i] after that point, as np.concatenate((parent1[:point], parent2[point:])).
+    """
+    parents1, parents2 = np.asarray(parents1), np.asarray(parents2)
+    points = rng.integers(1, max(high - 1, 2), size=len(parents1))
+    head = np.minimum(points, population.lengths[parents1])
+    lengths = head + np.maximum(population.lengths[parents2] - points, 0)
+    columns = np.arange(lengths.max(initial=0))
+    first, second = population.genes[parents1, :len(columns)], population.genes[parents2, :len(columns)]
+    # when the first parent is shorter than the point, the rest of the second one moves back to follow it
+    shifted = np.flatnonzero(head < points)
+    if len(shifted):
+        sources = columns - head[shifted, None] + points[shifted, None]
+        moved = np.take_along_axis(population.genes[parents2[shifted]], np.clip(sources, 0, population.genes.shape[1] - 1), axis=1)
+        second[shifted] = np.where(columns < lengths[shifted, None], moved, 0)
+    return Population(np.where(columns < head[:, None], first, second), lengths)
+
+
+def uniform_crossover(rng, population: Population, parents1, parents2, rate: float = 0.5) -> Population:
+    """
+    Every action of child i comes from gene parents1[i] with probability rate, otherwise from gene parents2[i].
+    The child is as long as its longest parent, past the end of the shortest one it takes the actions of the other.
+    """
+    parents1, parents2 = np.asarray(parents1), np.asarray(parents2)
+    lengths1, lengths2 = population.lengths[parents1], population.lengths[parents2]
+    lengths = np.maximum(lengths1, lengths2)
+    columns = np.arange(lengths.max(initial=0))
+    from_first = rng.random((len(parents1), len(columns)), dtype=np.float32) < rate
+    from_first = (from_first | (columns >= lengths2[:, None])) & (columns < lengths1[:, None])
+    return Population(np.where(from_first, population.genes[parents1, :len(columns)],
+                               population.genes[parents2, :len(columns)]), lengths)
+
+
+def point_mutation(rng, population: Population, high: int, action_space, rate=1.0, p=None) -> Population:
+    """
+    Replace one random action of the mutated genes by a random action, drawn with probabilities p.
+    """
+    rows = mutated_rows(rng, len(population), rate)
+    positions = rng.integers(0, high, size=len(rows))
+    actions = rng.choice(action_space, size=len(rows), p=p)
+    inside = positions < population.lengths[rows]
+    rows, positions = rows[inside], positions[inside]
+    population.genes[rows, positions] = actions[inside]
+    population.evaluated[rows] = False
+    return population
+
+
+def swap_mutation(rng, population: Population, high: int, rate=1.0) -> Population:
+    """
+    Swap two random actions of the mutated genes.
+    """
+    rows = mutated_rows(rng, len(population), rate)
+    positions = rng.integers(0, high, size=(len(rows), 2))
+    inside = (positions < population.lengths[rows, None]).all(axis=1)
+    rows, first, second = rows[inside], positions[inside, 0], positions[inside, 1]
+    genes = population.genes
+    genes[rows, first], genes[rows, second] = genes[rows, second], genes[rows, first]
+    population.evaluated[rows] = False
+    return population
+
+
+def scramble_mutation(rng, population: Population, high: int, rate=1.0) -> Population:
+    """
+    Shuffle the actions between two random positions of the mutated genes.
+    Every row is sorted by a key equal to the position of its actions, except in the scrambled
+    segment where the keys are random numbers within the segment, which shuffles it uniformly.
+    """
+    rows = mutated_rows(rng, len(population), rate)
+    starts = rng.integers(0, high, size=len(rows))
+    ends = np.minimum(rng.integers(starts, high + 1), population.lengths[rows])
+    scrambled = starts < ends - 1
+    rows, starts, ends = rows[scrambled], starts[scrambled], ends[scrambled]
+    if not len(rows):
+        return population
+    columns = np.arange(ends.max())
+    segment = (columns >= starts[:, None]) & (columns < ends[:, None])
+    # float32 keys, capped below the end of the segment so that rounding never moves a key past it
+    noise = rng.random((len(rows), len(columns)), dtype=np.float32)
+    noise *= (ends - starts).astype(np.float32)[:, None]
+    noise += starts.astype(np.float32)[:, None]
+    np.minimum(noise, np.nextafter(ends.astype(np.float32), 0)[:, None], out=noise)
+    keys = np.where(segment, noise, columns.astype(np.float32))
+    order = np.argsort(keys, axis=1)
+    population.genes[rows, :len(columns)] = np.take_along_axis(population.genes[rows, :len(columns)], order, axis=1)
+    population.evaluated[rows] = False
+    return population
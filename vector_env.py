@@ -0,0 +1,111 @@
+"""
+This module runs many frozen lakes side by side behind a gym-style vectorized API, for RL loops outside of the GAs.
+Every lane plays its own board, given as a FrozenLakeRaw, and all lanes are stepped at once through the
+transition tables of their boards, following the same rules as FrozenLakeRaw.take_action.
+Lanes whose episode ends are reset automatically, so step can be called in a loop without ever calling reset again.
+
+    env = VectorFrozenLake.random(num_envs=1024, size=8, slippery=True, rng=0)
+    observation, info = env.reset()
+    for _ in range(1000):
+        observation, reward, terminated, truncated, info = env.step(policy(observation))
+
+Observations are the cells of the players, as state = row * size + column on the board of their lane.
+"""
+
+import numpy as np
+
+from actions import ACTION_SPACE
+from batch_evaluator import StackedTables
+from frozen_lake_raw import FrozenLakeRaw, generate_hole_grids
+
+
+class VectorFrozenLake:
+    def __init__(self, lakes, max_steps: int = 100, rng=None):
+        """
+        lakes holds the game of every lane; the same game can be given for several lanes, which then share its tables.
+        Episodes are truncated after max_steps moves, or never if it is None.
+        """
+        if not len(lakes):
+            raise ValueError("at least one lake is needed")
+        self.lakes: list = list(lakes)
+        self.num_envs: int = len(self.lakes)
+        self.max_steps: int = max_steps
+        # slips come from this generator, not from the generators of the lakes
+        self.rng: np.random.Generator = np.random.default_rng(rng)
+        self.action_space = ACTION_SPACE
+
+        # the tables of every distinct board are stacked, as in the batched evaluator, lane states are offset into them
+        self.tables = StackedTables(self.lakes)
+        self.lanes = np.arange(self.num_envs)
+        self.offset = self.tables.offset
+        self.size = self.tables.size
+        self.goal_state = self.tables.goal_state - self.offset
+        self.slip_probability = self.tables.slip_probability
+        # number of cells of the board of every lane
+        self.num_states = self.size * self.size
+
+        self.state = np.zeros(self.num_envs, dtype=np.int64)
+        self.episode_return = np.zeros(self.num_envs)
+        self.episode_length = np.zeros(self.num_envs, dtype=np.int64)
+
+    @classmethod
+    def random(cls, num_envs: int, size: int = 4, slippery: bool = False, boards: int = None,
+               max_steps: int = 100, rng=None) -> "VectorFrozenLake":
+        """
+        num_envs lanes on random solvable boards of the same size: one board per lane by default,
+        or boards distinct boards spread over the lanes.
+        """
+        rng = np.random.default_rng(rng)
+        boards = num_envs if boards is None else boards
+        grids = generate_hole_grids(rng, size, boards, FrozenLakeRaw.hole_probability)
+        lakes = [FrozenLakeRaw(size=size, slippery=slippery, holes=holes) for holes in grids]
+        return cls([lakes[lane % boards] for lane in range(num_envs)], max_steps=max_steps, rng=rng)
+
+    def reset(self, seed=None):
+        """
+        Start a new episode on every lane. Returns the observations and an empty info dict.
+        """
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self.state[:] = 0
+        self.episode_return[:] = 0
+        self.episode_length[:] = 0
+        return self.state.copy(), {}
+
+    def step(self, actions):
+        """
+        Take one action on every lane. Returns observation, reward, terminated, truncated and info arrays.
+        terminated flags moves into a hole or into the goal, truncated the episodes that reached max_steps.
+        The lanes that are done are reset, so their observation is the start of a new episode, and info holds:
+        - final_observation: the cell where every episode ended (the hole or the goal when terminated),
+        - won: the episodes that reached the goal,
+        - episode_return and episode_length of the episodes that ended, zero for the other lanes.
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        if actions.shape != (self.num_envs,):
+            raise ValueError(f"expected one action per lane, shape ({self.num_envs},), got {actions.shape}")
+        # the same moves as in the batched evaluator, slips included
+        transition = self.tables.transition(self.offset + self.state, actions, self.lanes, self.rng)
+        next_state = self.tables.next_state[transition] - self.offset
+        reward = self.tables.step_reward[transition]
+        terminated = self.tables.terminal[transition]
+        self.episode_return += reward
+        self.episode_length += 1
+        truncated = np.zeros(self.num_envs, dtype=bool)
+        if self.max_steps is not None:
+            truncated = ~terminated & (self.episode_length >= self.max_steps)
+
+        done = terminated | truncated
+        info = {
+            'final_observation': next_state,
+            'won': terminated & (next_state == self.goal_state),
+            'episode_return': np.where(done, self.episode_return, 0.0),
+            'episode_length': np.where(done, self.episode_length, 0),
+        }
+        self.state = np.where(done, 0, next_state)
+        self.episode_return[done] = 0
+        self.episode_length[done] = 0
+        return self.state.copy(), reward, terminated, truncated, info
+
+    def __len__(self):
+        return self.num_envs